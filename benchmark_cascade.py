@@ -0,0 +1,104 @@
+"""
+Cascade Policy Benchmark
+========================
+Replays the CSV dataset through IntentSieve with different cascade risk
+floors and reports how often the guard model would be skipped, and how
+many attacks would skip it.
+
+The guard is replaced by a stand-in that answers "safe", so no model
+server is needed. The point is not the guard's verdicts but which calls
+reach it. Attacks that pass the heuristic layers and then skip the guard
+are the recall the cascade puts at risk.
+
+Usage: python benchmark_cascade.py [floor ...]
+"""
+
+import ast
+import contextlib
+import csv
+import io
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from langchain_core.messages import AIMessage
+
+from src.sieve import CascadePolicy, IntentSieve
+
+# Tools the benchmarked cascade may skip the guard for (as in main.py)
+READ_ONLY_TOOLS = ('read_local_file',)
+
+
+class SafeGuard:
+    """Guard stand-in: every request is judged safe."""
+
+    def invoke(self, messages):
+        return AIMessage(content="safe")
+
+
+def load_rows(filepath='test_dataset.csv'):
+    """Load (text, tool_call, is_attack) rows from the test dataset."""
+    rows = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                args = ast.literal_eval(row['tool_args']) if row['tool_args'] else {}
+            except (ValueError, SyntaxError):
+                args = {}
+            tool_call = {'name': row['tool_name'], 'args': args if isinstance(args, dict) else {}}
+            rows.append((row['text'], tool_call, row['is_attack'].upper() == 'TRUE'))
+    return rows
+
+
+def replay(rows, cascade):
+    """Validate every row; return per-row (is_attack, blocked_by_heuristics, skipped_guard)."""
+    sieve = IntentSieve(cascade=cascade)
+    sieve.guard = SafeGuard()
+    outcomes = []
+    for text, tool_call, is_attack in rows:
+        before = sieve.get_stats()
+        # The sieve prints every analyzed action
+        with contextlib.redirect_stdout(io.StringIO()):
+            status, _ = sieve.validate(text, tool_call)
+        after = sieve.get_stats()
+        reached_guard = after['guard_calls'] + after['guard_cache_hits'] > before['guard_calls'] + before['guard_cache_hits']
+        skipped = after['guard_skipped'] > before['guard_skipped']
+        outcomes.append((is_attack, status == "BLOCK" and not reached_guard, skipped))
+    return outcomes, sieve.get_stats()
+
+
+def main():
+    floors = [float(arg) for arg in sys.argv[1:]] or [0.05, 0.1, 0.15, 0.2, 0.3]
+    # Threat warnings would flood the report
+    logging.disable(logging.WARNING)
+
+    rows = load_rows()
+    attacks = sum(is_attack for _, _, is_attack in rows)
+    benign = len(rows) - attacks
+
+    baseline, _ = replay(rows, CascadePolicy())
+    heuristic_blocks = sum(is_attack and blocked for is_attack, blocked, _ in baseline)
+
+    print("=" * 60)
+    print("CASCADE POLICY BENCHMARK")
+    print("=" * 60)
+    print(f"Rows:                     {len(rows)} ({attacks} attacks, {benign} benign)")
+    print(f"Attacks blocked pre-guard: {heuristic_blocks}/{attacks} "
+          f"({heuristic_blocks / attacks:.1%} heuristic-only recall)")
+    print(f"\n{'floor':>6} {'skip rate':>10} {'invoke rate':>12} {'benign skipped':>15} {'attacks skipped':>16}")
+
+    for floor in floors:
+        outcomes, stats = replay(rows, CascadePolicy(read_only_tools=READ_ONLY_TOOLS, risk_floor=floor))
+        benign_skipped = sum(skipped for is_attack, _, skipped in outcomes if not is_attack)
+        attacks_skipped = sum(skipped for is_attack, _, skipped in outcomes if is_attack)
+        print(f"{floor:>6.2f} {stats['guard_skip_rate']:>10.1%} {stats['guard_invoke_rate']:>12.1%} "
+              f"{benign_skipped:>8}/{benign:<6} {attacks_skipped:>9}/{attacks:<6}")
+
+    print("\nAttacks skipped rely on the heuristic layers alone; at most that many")
+    print("are lost from recall compared with always invoking the guard.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Result Caching
+==============
+This module provides the bounded result cache used by the isolation and
+detection layers.
+
+The same intents and the same fetched pages recur constantly in agent
+traffic, so ``ContextualIsolator.sanitize`` and ``InjectionDetector.analyze``
+can skip recomputation for inputs they have already seen. Entries are keyed
+by a digest of the input text plus the configuration that shapes the result,
+evicted least-recently-used once the cache is full, and expired after a TTL.
+
+Cached values are shared between callers, so they must be immutable: the
+layers store tuples, frozen ThreatSignals and read-only metadata mappings.
+
+``VerdictCache`` holds guard-model verdicts. With temperature 0 the guard is
+deterministic for a given (intent, action, args), and each verdict costs a
+multi-second model call, so verdicts are also persisted to SQLite and
+survive restarts. Keys include the model name, so a new guard model never
+reuses an old model's verdicts.
+
+Author: Intense Sieve Security Team
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+
+from .metrics import StatCounters
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with optional time-to-live.
+
+    Usage:
+        cache = ResultCache(max_size=1024, ttl=300.0)
+        key = cache.make_key(text, (0.12, 4.5))
+        result = cache.get(key)
+        if result is None:
+            result = expensive(text)
+            cache.put(key, result)
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 300.0):
+        """
+        Args:
+            max_size: Maximum number of entries kept (least recently used go first)
+            ttl: Seconds an entry stays valid (None = never expires)
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> (expires_at, value), oldest first
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = StatCounters(['hits', 'misses', 'evictions', 'expirations'])
+
+    @staticmethod
+    def make_key(text: str, config: Tuple = ()) -> Tuple[bytes, Tuple]:
+        """
+        Build a cache key from the input text and the result-shaping config.
+
+        Hashing keeps large pages from being held as dictionary keys.
+        """
+        digest = hashlib.blake2b(
+            text.encode('utf-8', 'surrogatepass'), digest_size=16
+        ).digest()
+        return digest, config
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key``, or None on a miss or expiry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.stats.increment('hits')
+                    return value
+                del self._entries[key]
+                self.stats.increment('expirations')
+        self.stats.increment('misses')
+        return None
+
+    def put(self, key: Hashable, value: Any):
+        """Store ``value`` under ``key``, evicting the least recently used entry if full."""
+        expires_at = float('inf') if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.increment('evictions')
+
+    def clear(self):
+        """Drop every entry (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters, current size and hit rate."""
+        stats = self.stats.snapshot()
+        lookups = stats['hits'] + stats['misses']
+        stats['size'] = len(self._entries)
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class VerdictCache:
+    """
+    Two-tier guard verdict cache: in-memory LRU in front of SQLite.
+
+    Usage:
+        cache = VerdictCache("llama-guard3:8b", path="logs/guard_verdicts.sqlite3")
+        verdict = cache.get(intent, action, args)
+        if verdict is None:
+            verdict = guard.invoke(prompt).content
+            cache.put(intent, action, args, verdict)
+
+    aget/aput do the same for async callers, with the SQLite tier run in a
+    worker thread so disk lookups and commits never block the event loop.
+    """
+
+    def __init__(self, model: str, path: Optional[str] = None,
+                 max_size: int = 1024, ttl: Optional[float] = 86400.0):
+        """
+        Args:
+            model: Guard model name; verdicts are only reused for the same model
+            path: SQLite file for the persistent tier (None = memory only)
+            max_size: Entries kept in the in-memory tier
+            ttl: Seconds a verdict stays valid in both tiers (None = never expires)
+        """
+        self.model = model
+        self.path = path
+        self.ttl = ttl
+        self._memory = ResultCache(max_size=max_size, ttl=ttl)
+        self.stats = StatCounters(['memory_hits', 'disk_hits', 'misses', 'stores'])
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            # One connection shared across threads, serialized by _lock
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, "
+                "verdict TEXT NOT NULL, expires_at REAL)"
+            )
+            self._db.commit()
+
+    def make_key(self, intent: str, action: str, args: Mapping) -> str:
+        """
+        Digest of the canonical (model, intent, action, args) request.
+
+        Args are serialized with sorted keys so {'a': 1, 'b': 2} and
+        {'b': 2, 'a': 1} share a verdict.
+        """
+        canonical = json.dumps(
+            [self.model, intent, action, args],
+            sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str
+        )
+        return hashlib.blake2b(
+            canonical.encode('utf-8', 'surrogatepass'), digest_size=16
+        ).hexdigest()
+
+    def get(self, intent: str, action: str, args: Mapping) -> Optional[str]:
+        """Return the cached verdict text, or None if neither tier has a live entry."""
+        key = self.make_key(intent, action, args)
+        verdict = self._memory_get(key)
+        if verdict is None and self._db is not None:
+            verdict = self._disk_get(key)
+        if verdict is None:
+            self.stats.increment('misses')
+        return verdict
+
+    async def aget(self, intent: str, action: str, args: Mapping) -> Optional[str]:
+        """get() for async callers: the SQLite lookup runs in a worker thread."""
+        key = self.make_key(intent, action, args)
+        verdict = self._memory_get(key)
+        if verdict is None and self._db is not None:
+            # run_in_executor rather than asyncio.to_thread (Python 3.9+)
+            verdict = await asyncio.get_running_loop().run_in_executor(None, self._disk_get, key)
+        if verdict is None:
+            self.stats.increment('misses')
+        return verdict
+
+    def put(self, intent: str, action: str, args: Mapping, verdict: str):
+        """Store a guard verdict in both tiers."""
+        key = self.make_key(intent, action, args)
+        self._memory_put(key, verdict)
+        if self._db is not None:
+            self._disk_put(key, verdict)
+
+    async def aput(self, intent: str, action: str, args: Mapping, verdict: str):
+        """put() for async callers: the SQLite write and commit run in a worker thread."""
+        key = self.make_key(intent, action, args)
+        self._memory_put(key, verdict)
+        if self._db is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._disk_put, key, verdict)
+
+    # === TIERS ===
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        verdict = self._memory.get(key)
+        if verdict is not None:
+            self.stats.increment('memory_hits')
+        return verdict
+
+    def _memory_put(self, key: str, verdict: str):
+        self._memory.put(key, verdict)
+        self.stats.increment('stores')
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT verdict, expires_at FROM verdicts WHERE key = ? AND model = ?",
+                (key, self.model)
+            ).fetchone()
+            if row is not None and row[1] is not None and row[1] <= time.time():
+                self._db.execute("DELETE FROM verdicts WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+        if row is None:
+            return None
+        # Promote so the next lookup stays in memory
+        self._memory.put(key, row[0])
+        self.stats.increment('disk_hits')
+        return row[0]
+
+    def _disk_put(self, key: str, verdict: str):
+        expires_at = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO verdicts (key, model, verdict, expires_at) VALUES (?, ?, ?, ?)",
+                (key, self.model, verdict, expires_at)
+            )
+            self._db.commit()
+
+    def purge(self) -> int:
+        """Delete expired rows and rows written by other models; returns rows removed."""
+        if self._db is None:
+            return 0
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM verdicts WHERE model != ? OR (expires_at IS NOT NULL AND expires_at <= ?)",
+                (self.model, time.time())
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        """Drop every entry from both tiers (statistics are kept)."""
+        self._memory.clear()
+        if self._db is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM verdicts")
+                self._db.commit()
+
+    def close(self):
+        """Close the SQLite connection (the memory tier keeps working)."""
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-tier hit counters, misses, stores and overall hit rate."""
+        stats = self.stats.snapshot()
+        hits = stats['memory_hits'] + stats['disk_hits']
+        lookups = hits + stats['misses']
+        stats['memory_size'] = len(self._memory)
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,140 @@
+"""
+Confusables Skeleton Table
+==========================
+This module maps visually confusable characters to the ASCII character
+they imitate, following the "skeleton" idea of Unicode TS #39.
+
+``ContextualIsolator.SUSPICIOUS_LOOKALIKES`` only covers ten lowercase
+Cyrillic letters. Attackers also write "Ｉｇｎｏｒｅ" (fullwidth),
+"𝐝𝐞𝐥𝐞𝐭𝐞" (mathematical bold), "ΑDΜΙΝ" (Greek capitals) and similar, which
+read as plain English to humans and to the model but slip past every
+keyword and phrase pattern.
+
+The table is built from two sources:
+1. Compatibility blocks (fullwidth forms, mathematical alphanumerics,
+   letterlike symbols, enclosed alphanumerics, ...) via NFKC
+2. A curated list of Greek, Cyrillic, Armenian and Latin homoglyphs that
+   NFKC leaves alone
+
+Only single characters whose skeleton is printable ASCII are kept, so the
+whole table fits in a two-level byte array (one 256-entry page per used
+block of code points). Lookup is two array reads, and the table is built
+on first use rather than at import time.
+
+Author: Intense Sieve Security Team
+"""
+
+import threading
+import unicodedata
+from array import array
+from typing import Iterator, Optional
+
+# Code point ranges [start, end) whose NFKC form is an ASCII lookalike
+COMPATIBILITY_RANGES = (
+    (0x3000, 0x3001),    # Ideographic space
+    (0xFF01, 0xFF5F),    # Fullwidth ASCII: Ｉｇｎｏｒｅ
+    (0x1D400, 0x1D800),  # Mathematical alphanumerics: 𝐝𝐞𝐥𝐞𝐭𝐞, 𝚜𝚢𝚜𝚝𝚎𝚖
+    (0x2100, 0x2150),    # Letterlike symbols: ℂ, ℌ, ℓ
+    (0x2150, 0x2190),    # Number forms: Ⅰ, Ⅴ, ⅹ
+    (0x2460, 0x2500),    # Enclosed alphanumerics: ①, Ⓐ
+    (0x1F130, 0x1F18A),  # Squared latin letters: 🄰
+    (0x2070, 0x20A0),    # Superscripts and subscripts
+    (0x1D2C, 0x1D6B),    # Modifier letters: ᴬ, ᵈ
+    (0x02B0, 0x02E5),    # Spacing modifier letters: ʰ, ʲ
+)
+
+# Homoglyphs NFKC does not fold: "<confusable><ascii>" pairs
+HOMOGLYPH_PAIRS = (
+    # Greek capitals and lowercase
+    "ΑAΒBΕEΖZΗHΙIΚKΜMΝNΟOΡPΤTΥYΧXϹCϺM"
+    "αaοoρpιiνvυuχxκkγyϲcϳjϱp"
+    # Cyrillic capitals and lowercase (beyond SUSPICIOUS_LOOKALIKES)
+    "АAВBЕEКKМMНHОOРPСCТTУYХXЅSІIЈJԌGԚQԜWӀI"
+    "һhԁdԛqԝwӏlүyɡgԍgѵvѡwҺh"
+    # Armenian
+    "օoսuցgհhոnԱUՍU"
+    # Latin letter variants
+    "ıiȷjɑaɩiʏyɪiʟlᴄcᴏoᴠvᴡwᴢzꜱs"
+)
+
+_PAGE_BITS = 8
+_PAGE_SIZE = 1 << _PAGE_BITS
+
+
+class ConfusableTable:
+    """
+    Compact confusable -> ASCII skeleton lookup.
+
+    Usage:
+        table = get_confusable_table()
+        table.lookup('Ｉ')  # 'I'
+        table.lookup('x')   # None (not a confusable)
+    """
+
+    def __init__(self):
+        # Page 0 is the shared all-zero page for unmapped blocks
+        self._index = array('H', bytes(2 * (0x110000 >> _PAGE_BITS)))
+        self._pages = array('B', bytes(_PAGE_SIZE))
+        self._size = 0
+
+        curated = dict(zip(HOMOGLYPH_PAIRS[0::2], HOMOGLYPH_PAIRS[1::2]))
+        for char, target in curated.items():
+            self._add(char, target)
+
+        for start, end in COMPATIBILITY_RANGES:
+            for code in range(start, end):
+                folded = unicodedata.normalize('NFKC', chr(code))
+                # Mathematical Greek folds to Greek, then on to its Latin twin
+                folded = curated.get(folded, folded)
+                if len(folded) == 1 and ' ' <= folded <= '~':
+                    self._add(chr(code), folded)
+
+    def _add(self, char: str, target: str):
+        code = ord(char)
+        if code < 0x80:
+            return
+        page = self._index[code >> _PAGE_BITS]
+        if page == 0:
+            page = len(self._pages) >> _PAGE_BITS
+            self._pages.extend(bytes(_PAGE_SIZE))
+            self._index[code >> _PAGE_BITS] = page
+        slot = (page << _PAGE_BITS) | (code & (_PAGE_SIZE - 1))
+        if self._pages[slot] == 0:
+            self._size += 1
+        self._pages[slot] = ord(target)
+
+    def lookup(self, char: str) -> Optional[str]:
+        """Return the ASCII skeleton of ``char``, or None if it is not a confusable."""
+        code = ord(char)
+        target = self._pages[(self._index[code >> _PAGE_BITS] << _PAGE_BITS) | (code & (_PAGE_SIZE - 1))]
+        return chr(target) if target else None
+
+    def chars(self) -> Iterator[str]:
+        """Iterate over every confusable character in the table."""
+        for block, page in enumerate(self._index):
+            if page == 0:
+                continue
+            base = page << _PAGE_BITS
+            for offset in range(_PAGE_SIZE):
+                if self._pages[base + offset]:
+                    yield chr((block << _PAGE_BITS) | offset)
+
+    def __contains__(self, char: str) -> bool:
+        return self.lookup(char) is not None
+
+    def __len__(self):
+        return self._size
+
+
+_table: Optional[ConfusableTable] = None
+_table_lock = threading.Lock()
+
+
+def get_confusable_table() -> ConfusableTable:
+    """Return the shared table, building it on first call."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = ConfusableTable()
+    return _table
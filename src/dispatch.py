@@ -0,0 +1,175 @@
+"""
+Guard Request Dispatching
+=========================
+This module provides the micro-batching dispatcher that sits between
+IntentSieve and the guard chat model.
+
+When many agent sessions validate at once, each guard check would be its
+own independent request. ``GuardDispatcher`` instead collects the prompts
+that arrive within ``max_wait`` seconds (up to ``max_batch_size``), submits
+them together through the chat model's ``batch`` interface over a bounded
+number of concurrent requests, and fans each verdict back out to the
+caller waiting for it.
+
+The dispatcher exposes ``invoke``/``ainvoke`` like a chat model, so it can
+be passed wherever IntentSieve expects its guard and shared between many
+sieves.
+
+Author: Intense Sieve Security Team
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import StatCounters
+
+logger = logging.getLogger(__name__)
+
+# Queue item telling the collector thread to stop
+_CLOSE = None
+
+
+class GuardDispatcher:
+    """
+    Micro-batching front for a guard chat model.
+
+    Usage:
+        dispatcher = GuardDispatcher(ChatOllama(model="llama-guard3:8b", temperature=0))
+        sieve_a = IntentSieve(guard=dispatcher)
+        sieve_b = IntentSieve(guard=dispatcher)  # Requests from both share batches
+        ...
+        dispatcher.close()
+
+    Batches run one at a time: prompts arriving while a batch is with the
+    model queue up and form the next batch.
+    """
+
+    def __init__(self, guard, max_batch_size: int = 8, max_wait: float = 0.005,
+                 max_concurrency: int = 4):
+        """
+        Args:
+            guard: Chat model with a LangChain-style batch() method
+            max_batch_size: Most prompts submitted together
+            max_wait: Seconds to wait for more prompts after the first arrives
+            max_concurrency: Most guard requests in flight within a batch
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.guard = guard
+        # Model name of the wrapped guard, so sieves key cached verdicts on it
+        self.model = getattr(guard, 'model', None)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = StatCounters(['requests', 'batches', 'errors'])
+        # Written only by the collector thread
+        self.largest_batch = 0
+
+    # === SUBMISSION ===
+
+    def submit(self, messages) -> Future:
+        """Queue one guard prompt; the returned future resolves to the model response."""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GuardDispatcher is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._collect, name="guard-dispatcher", daemon=True
+                )
+                self._thread.start()
+            self._queue.put((messages, future))
+        self.stats.increment('requests')
+        return future
+
+    def invoke(self, messages):
+        """Blocking call, batched with any concurrent callers."""
+        return self.submit(messages).result()
+
+    async def ainvoke(self, messages):
+        """Async call, batched with any concurrent callers."""
+        return await asyncio.wrap_future(self.submit(messages))
+
+    def close(self):
+        """Finish queued prompts, then stop the collector thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._queue.put(_CLOSE)
+        if thread is not None:
+            thread.join()
+
+    # === COLLECTOR THREAD ===
+
+    def _collect(self):
+        """Form batches from the queue and run them until closed."""
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is _CLOSE:
+                break
+            batch = [item]
+
+            # Wait up to max_wait after the first prompt for the batch to fill
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    closing = True
+                    break
+                batch.append(item)
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[Any, Future]]):
+        """Submit one batch to the guard and resolve each caller's future."""
+        # Callers may have cancelled while waiting
+        pending = [(messages, future) for messages, future in batch
+                   if future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+
+        self.stats.increment('batches')
+        self.largest_batch = max(self.largest_batch, len(pending))
+
+        try:
+            responses = self.guard.batch(
+                [messages for messages, _ in pending],
+                config={'max_concurrency': self.max_concurrency},
+                return_exceptions=True
+            )
+        except Exception as e:
+            logger.error(f"Guard batch of {len(pending)} failed: {e}")
+            responses = [e] * len(pending)
+
+        for (_, future), response in zip(pending, responses):
+            if isinstance(response, Exception):
+                self.stats.increment('errors')
+                future.set_exception(response)
+            else:
+                future.set_result(response)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Request/batch counters, largest batch and mean batch size."""
+        stats = self.stats.snapshot()
+        stats['largest_batch'] = self.largest_batch
+        stats['mean_batch_size'] = round(stats['requests'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
@@ -13,10 +13,20 @@ Key Threats Addressed:
 Author: Intense Sieve Security Team
 """
 
+import os
 import re
+import codecs
+import itertools
 import unicodedata
 import logging
-from typing import Tuple, Dict
+import tempfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
+from typing import Tuple, Dict, List, Optional, Union, Iterable, Iterator
+
+from .cache import ResultCache
+from .metrics import StatCounters
 
 # Configure module logger
 logger = logging.getLogger(__name__)
@@ -91,21 +101,54 @@ class ContextualIsolator:
         '(': 'c',
     }
     
-    def __init__(self, max_length: int = 10000):
+    # Stages that only remove characters: agent and detection views agree on them
+    REMOVAL_CATEGORIES = frozenset({'zero_width_removed', 'control_chars_removed'})
+    
+    # Counted cleaning stages: (threats_detected label, metadata and stats key)
+    CHARACTER_STAGES = (
+        ('confusables', 'confusables_normalized'),
+        ('hidden_chars', 'zero_width_removed'),
+        ('control_chars', 'control_chars_removed'),
+        ('lookalikes', 'lookalikes_normalized'),
+        ('leetspeak', 'leetspeak_normalized'),
+    )
+    
+    # Whitespace runs collapsed by the last cleaning stage
+    SPACE_RUN = re.compile(r' {2,}')
+    NEWLINE_RUN = re.compile(r'\n{3,}')
+    
+    def __init__(self, max_length: int = 10000, cache_size: int = 0,
+                 cache_ttl: Optional[float] = 300.0, fast_paths: bool = True):
         """
         Initialize the Contextual Isolator.
         
         Args:
             max_length: Maximum allowed length for input text (prevents denial-of-service)
+            cache_size: Number of sanitize() results to cache (0 = no caching)
+            cache_ttl: Seconds a cached result stays valid (None = no expiry)
+            fast_paths: Skip stages that provably cannot change the input
+                        (listed in metadata['skipped_stages'])
         """
         self.max_length = max_length
-        self.stats = {
-            'zero_width_removed': 0,
-            'control_chars_removed': 0,
-            'lookalikes_normalized': 0,
-            'leetspeak_normalized': 0,
-            'inputs_processed': 0,
-        }
+        self.fast_paths = fast_paths
+        # With caching on, sanitize() returns read-only metadata shared between callers
+        self.cache = ResultCache(cache_size, cache_ttl) if cache_size > 0 else None
+        # Per-thread counters, merged on get_stats() (safe under threaded servers)
+        self.stats = StatCounters([
+            'zero_width_removed',
+            'control_chars_removed',
+            'lookalikes_normalized',
+            'leetspeak_normalized',
+            'confusables_normalized',
+            'inputs_processed',
+        ])
+        # Stages 1-4 run as one translation pass (see _clean_characters)
+        (self._character_table,
+         self._character_categories,
+         self._character_pattern) = self._build_character_tables()
+        # Built on first use so the confusables table loads lazily
+        self._confusable_pattern = None
+        self._view_tables = None
     
     def sanitize(self, untrusted_input: str) -> Tuple[str, Dict[str, any]]:
         """
@@ -120,12 +163,313 @@ class ContextualIsolator:
         Returns:
             Tuple of (cleaned_text, metadata_dict)
             - cleaned_text: Safe version with dangerous characters removed
-            - metadata: Dict with info about what was removed (for logging/auditing)
+            - metadata: Dict with info about what was removed (for logging/auditing).
+              Read-only (threats_detected is a tuple) when caching is enabled.
+        """
+        return self._sanitize_cached(untrusted_input, views=False)
+    
+    def sanitize_views(self, untrusted_input: str) -> Tuple[str, str, Dict[str, any]]:
+        """
+        Sanitize once, producing one view for detection and one for the agent.
+        
+        Leetspeak, lookalike and confusable folding make injections visible
+        to InjectionDetector, but they also rewrite every digit and symbols
+        like '$', '@' and '(' - corrupting prices, numbers and code that the
+        agent should see as-is. This returns both views from one traversal
+        of the input instead of sanitizing twice.
+        
+        Args:
+            untrusted_input: Raw text from external sources
+            
+        Returns:
+            Tuple of (detection_text, agent_text, metadata)
+            - detection_text: Same as sanitize() - fully normalized, for InjectionDetector
+            - agent_text: Hidden and control characters removed, NFC and
+              whitespace normalized, but letters, digits and symbols kept
+            - metadata: Same as sanitize()
+        """
+        return self._sanitize_cached(untrusted_input, views=True)
+    
+    def _sanitize_cached(self, untrusted_input: str, views: bool) -> tuple:
+        """Run _sanitize() through the result cache, if enabled."""
+        self.stats.increment('inputs_processed')
+        
+        if self.cache is None or not untrusted_input:
+            return self._sanitize(untrusted_input, views)
+        
+        key = self.cache.make_key(untrusted_input, (self.max_length, views))
+        cached = self.cache.get(key)
+        if cached is not None:
+            # Count the repeat like a fresh input so stats keep tracking traffic
+            for _, category in self.CHARACTER_STAGES:
+                if category in cached[-1]:
+                    self.stats.increment(category, cached[-1][category])
+            return cached
+        
+        *texts, metadata = self._sanitize(untrusted_input, views)
+        metadata['threats_detected'] = tuple(metadata['threats_detected'])
+        if 'skipped_stages' in metadata:
+            metadata['skipped_stages'] = tuple(metadata['skipped_stages'])
+        result = (*texts, MappingProxyType(metadata))
+        self.cache.put(key, result)
+        return result
+    
+    def sanitize_many(self, texts: Iterable[str], workers: Optional[int] = None,
+                      chunksize: int = 64) -> Iterator[Tuple[str, Dict[str, any]]]:
+        """
+        Sanitize a large collection of texts across a process pool.
+        
+        Texts are sent to worker processes in batches of ``chunksize``;
+        results are yielded in input order as soon as each batch is done.
+        At most 2 * workers batches are in flight, so an iterable of
+        hundreds of thousands of documents is never loaded at once. Each
+        worker's stats are merged into this isolator's stats per batch.
+        
+        On platforms that spawn workers (Windows, macOS), call this from
+        under ``if __name__ == "__main__":``.
+        
+        Args:
+            texts: Iterable of raw texts
+            workers: Number of worker processes (default: CPU count;
+                     1 sanitizes in this process)
+            chunksize: Texts per batch sent to a worker
+            
+        Yields:
+            (cleaned_text, metadata) tuples, as from sanitize()
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            for text in texts:
+                yield self.sanitize(text)
+            return
+        
+        iterator = iter(texts)
+        batches = iter(lambda: list(itertools.islice(iterator, chunksize)), [])
+        
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(self.max_length, self.fast_paths))
+        pending = deque()
+        try:
+            for batch in batches:
+                pending.append(pool.submit(_sanitize_batch, batch))
+                if len(pending) >= 2 * workers:
+                    yield from self._merge_batch(pending.popleft().result())
+            while pending:
+                yield from self._merge_batch(pending.popleft().result())
+        finally:
+            # A consumer that stops early abandons queued batches; cancel them
+            # here (shutdown's cancel_futures needs Python 3.9)
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+    
+    def _merge_batch(self, batch_result) -> List[Tuple[str, Dict[str, any]]]:
+        """Fold a worker batch's stats into ours and return its results."""
+        results, worker_stats = batch_result
+        self.stats.merge(worker_stats)
+        return results
+    
+    # Most bytes one code point can take (UTF-8, UTF-16 and UTF-32 alike)
+    MAX_BYTES_PER_CHAR = 4
+    
+    def sanitize_bytes(self, buf: Union[bytes, bytearray, memoryview],
+                       encoding: str = 'utf-8') -> Tuple[str, Dict[str, any]]:
+        """
+        Sanitize a raw response body without decoding all of it.
+        
+        Only the first max_length * MAX_BYTES_PER_CHAR bytes can contribute
+        to the truncated text, so the body is sliced through a memoryview
+        (no copy) before decoding and the rest is never touched. A multibyte
+        sequence cut by the slice is dropped rather than replaced. The text
+        is materialized once by the decoder and then cleaned by sanitize(),
+        whose first pass strips invisible and control characters.
+        
+        Views that are not C-contiguous are accepted too: strided 1-D views
+        (e.g. ``memoryview(body)[::2]``) copy only the decoded prefix, while
+        Fortran-ordered and other multi-dimensional buffers are copied
+        whole in C order before slicing.
+        
+        Args:
+            buf: Raw bytes from an external source
+            encoding: Text encoding of ``buf`` (invalid sequences become U+FFFD)
+            
+        Returns:
+            Tuple of (cleaned_text, metadata_dict) as from sanitize(), with
+            'input_bytes' added to the metadata
+        """
+        if isinstance(buf, str):
+            raise TypeError("sanitize_bytes() takes bytes-like input; use sanitize() for str")
+        
+        view = memoryview(buf)
+        limit = self.max_length * self.MAX_BYTES_PER_CHAR
+        total = view.nbytes
+        
+        if total > limit:
+            logger.warning(f"Input truncated from {total} to {limit} bytes before decoding")
+        
+        if view.c_contiguous:
+            prefix = view.cast('B')[:limit]
+        elif view.ndim == 1:
+            # Strided views (e.g. buf[::2]) cannot be cast; copy just the
+            # leading items that cover the limit, never the whole body
+            prefix = view[:-(-limit // view.itemsize)].tobytes()[:limit]
+        else:
+            # Fortran-ordered and other multi-dimensional layouts can be
+            # neither cast nor sliced; copy them in C order
+            prefix = view.tobytes()[:limit]
+        
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        text = decoder.decode(prefix, final=total <= limit)
+        
+        cleaned, metadata = self.sanitize(text)
+        # Fresh dict: never mutate a (possibly cached) sanitize() result
+        metadata = dict(metadata, input_bytes=total)
+        return cleaned, metadata
+    
+    # Streaming: characters cleaned per step, and max characters held back
+    STREAM_WINDOW = 8192
+    STREAM_MAX_CARRY = 4096
+    
+    def sanitize_stream(self, chunks: Iterable[str],
+                        metadata: Optional[Dict[str, any]] = None) -> Iterator[str]:
         """
-        self.stats['inputs_processed'] += 1
+        Sanitize a document delivered as an iterable of text chunks.
+        
+        Unlike sanitize(), the document is NOT cut at max_length: an
+        attacker could otherwise hide a payload after the 10,000th
+        character. Memory stays bounded by STREAM_WINDOW and
+        STREAM_MAX_CARRY instead, whatever the document size.
+        
+        Joining the yielded chunks gives the same text as sanitize() on the
+        whole document (without truncation). The tail of each window is
+        held back until the next chunk arrives, so that:
+        - combining marks at the start of a chunk still compose (NFC)
+          with the character before them
+        - space runs and newline runs split across chunks are still
+          collapsed, and trailing whitespace is still stripped
+        
+        A long whitespace tail is held as repeat-counted blocks (see
+        _WhitespaceTail), so padding made of runs or short repeated
+        patterns takes a few entries whatever its length. An aperiodic tail
+        that outgrows STREAM_MAX_CARRY spills to a temporary file instead,
+        so the output matches sanitize() for every input.
         
+        Args:
+            chunks: Iterable of raw text chunks, in document order
+            metadata: Optional dict filled with the same keys sanitize()
+                      reports (except skipped_stages); complete once the
+                      generator is exhausted
+            
+        Yields:
+            Cleaned text chunks (never empty)
+        """
+        self.stats.increment('inputs_processed')
+        
+        metadata = {} if metadata is None else metadata
+        metadata.update({'original_length': 0, 'threats_detected': []})
+        counts: Dict[str, int] = {}
+        final_length = 0
+        carry = ''
+        # Whitespace held back beyond the carry
+        tail = _WhitespaceTail(max_runs=self.STREAM_MAX_CARRY // _WhitespaceTail.BLOCK,
+                               spill_size=self.STREAM_MAX_CARRY)
+        started = False  # Leading whitespace of the document is stripped
+        
+        for chunk in chunks:
+            for piece_start in range(0, len(chunk), self.STREAM_WINDOW):
+                piece = chunk[piece_start:piece_start + self.STREAM_WINDOW]
+                metadata['original_length'] += len(piece)
+                
+                # Stages 0-4 are per-character, so each piece is cleaned alone
+                piece, confusable_count = self._normalize_confusables(piece)
+                piece, piece_counts = self._clean_characters(piece)
+                if confusable_count > 0:
+                    piece_counts['confusables_normalized'] = confusable_count
+                for category, count in piece_counts.items():
+                    counts[category] = counts.get(category, 0) + count
+                
+                # Stages 5-6 see the held-back tail plus the new piece
+                buffer = self._collapse_whitespace(self._normalize_unicode(carry + piece))
+                split = self._stream_split(buffer)
+                ready, carry = buffer[:split], buffer[split:]
+                
+                if not started:
+                    ready = ready.lstrip()
+                    started = bool(ready)
+                if ready:
+                    for held in tail.drain():
+                        final_length += len(held)
+                        yield held
+                    final_length += len(ready)
+                    yield ready
+                
+                if len(carry) > self.STREAM_MAX_CARRY and not carry.strip():
+                    # Keep the last two characters so a space or newline
+                    # run continuing in the next piece still collapses
+                    if started:
+                        tail.add(carry[:-2])
+                    carry = carry[-2:]
+        
+        ready = carry.rstrip() if started else carry.strip()
+        if ready:
+            for held in tail.drain():
+                final_length += len(held)
+                yield held
+            final_length += len(ready)
+            yield ready
+        
+        if metadata['original_length'] == 0:
+            metadata.clear()
+            metadata['warning'] = "Empty input"
+            return
+        
+        self._finish_metadata(metadata, counts, final_length)
+    
+    def _stream_split(self, buffer: str) -> int:
+        """
+        Return where ``buffer`` can be cut with everything before it final.
+        
+        ``buffer`` is already NFC-normalized and whitespace-collapsed.
+        Trailing whitespace is held back whole (it may grow into a run or
+        end the document; sanitize_stream() compacts long tails), and
+        otherwise the last starter is held back, since combining marks in
+        the next chunk may still compose with it. Marks never compose
+        across a starter, so the text before it is final.
+        """
+        end = len(buffer)
+        split = len(buffer.rstrip())
+        if split < end:
+            return split
+        
+        for index in range(end - 1, max(-1, end - self.STREAM_MAX_CARRY - 1), -1):
+            if self._is_stable_starter(buffer[index]):
+                split = index
+                break
+        else:
+            split = 0
+        
+        # Bound memory on pathological input (e.g. endless combining marks)
+        if end - split > self.STREAM_MAX_CARRY:
+            split = end - self.STREAM_MAX_CARRY
+        
+        return split
+    
+    @staticmethod
+    def _is_stable_starter(char: str) -> bool:
+        """True if ``char`` blocks composition with anything before it."""
+        return (unicodedata.combining(char) == 0 and
+                unicodedata.combining(unicodedata.normalize('NFD', char)[0]) == 0)
+    
+    def _sanitize(self, untrusted_input: str, views: bool = False) -> tuple:
+        """
+        Run the cleaning pipeline (uncached).
+        
+        Returns (cleaned_text, metadata), or (detection_text, agent_text,
+        metadata) when ``views`` is set.
+        """
         if not untrusted_input:
-            return "", {"warning": "Empty input"}
+            empty = {"warning": "Empty input"}
+            return ("", "", empty) if views else ("", empty)
         
         # Truncate excessive input (prevents context overflow attacks)
         if len(untrusted_input) > self.max_length:
@@ -136,153 +480,275 @@ class ContextualIsolator:
             'original_length': len(untrusted_input),
             'threats_detected': [],
         }
+        skipped_stages = []
+        # Every confusable, zero-width char and lookalike is non-ASCII,
+        # and ASCII text is always in NFC
+        ascii_only = self.fast_paths and untrusted_input.isascii()
         
         # === CLEANING PIPELINE ===
         
-        # Stage 1: Remove hidden/invisible characters
-        cleaned, hidden_count = self._remove_hidden_chars(untrusted_input)
-        if hidden_count > 0:
-            metadata['threats_detected'].append(f"hidden_chars: {hidden_count}")
-            metadata['zero_width_removed'] = hidden_count
-            self.stats['zero_width_removed'] += hidden_count
-        
-        # Stage 2: Remove suspicious control characters
-        cleaned, control_count = self._remove_control_chars(cleaned)
-        if control_count > 0:
-            metadata['threats_detected'].append(f"control_chars: {control_count}")
-            metadata['control_chars_removed'] = control_count
-            self.stats['control_chars_removed'] += control_count
-        
-        # Stage 3: Normalize lookalike characters (homoglyphs)
-        cleaned, lookalike_count = self._normalize_lookalikes(cleaned)
-        if lookalike_count > 0:
-            metadata['threats_detected'].append(f"lookalikes: {lookalike_count}")
-            metadata['lookalikes_normalized'] = lookalike_count
-            self.stats['lookalikes_normalized'] += lookalike_count
-        
-        # Stage 4: Normalize leetspeak obfuscation
-        cleaned, leetspeak_count = self._normalize_leetspeak(cleaned)
-        if leetspeak_count > 0:
-            metadata['threats_detected'].append(f"leetspeak: {leetspeak_count}")
-            metadata['leetspeak_normalized'] = leetspeak_count
-            self.stats['leetspeak_normalized'] += leetspeak_count
+        if views:
+            # Stages 0-4 for both views in one traversal
+            cleaned, agent_text, counts = self._clean_character_views(untrusted_input)
+            detection_text = cleaned
+        else:
+            # Stage 0: Fold confusables (fullwidth, math alphanumerics, Greek...)
+            # to ASCII first, so folded digits and symbols still reach leetspeak
+            if ascii_only:
+                cleaned, confusable_count = untrusted_input, 0
+                skipped_stages.append('confusables')
+            else:
+                cleaned, confusable_count = self._normalize_confusables(untrusted_input)
+            
+            # Stages 1-4: Remove hidden and control characters, normalize
+            # lookalikes (homoglyphs) and leetspeak - all in one pass
+            cleaned, counts = self._clean_characters(cleaned)
+            if confusable_count > 0:
+                counts['confusables_normalized'] = confusable_count
+        
+        # Stages 5-6: Unicode normalization and whitespace collapse
+        cleaned = self._normalize_layout(cleaned, ascii_only, skipped_stages)
+        
+        if skipped_stages:
+            metadata['skipped_stages'] = skipped_stages
+        self._finish_metadata(metadata, counts, len(cleaned))
+        
+        if views:
+            # Same string when nothing was folded: share the finished text
+            if agent_text is detection_text:
+                agent_text = cleaned
+            else:
+                agent_text = self._normalize_layout(agent_text, ascii_only)
+            return cleaned, agent_text, metadata
+        return cleaned, metadata
+    
+    def _normalize_layout(self, text: str, ascii_only: bool,
+                          skipped_stages: Optional[List[str]] = None) -> str:
+        """Stages 5-6, skipping whichever cannot change ``text`` (fast paths)."""
+        skipped_stages = [] if skipped_stages is None else skipped_stages
         
         # Stage 5: Unicode normalization (canonical form)
-        cleaned = self._normalize_unicode(cleaned)
-        
-        # Stage 6
-        # Stage 5: Collapse excessive whitespace
-        cleaned = self._normalize_whitespace(cleaned)
+        if ascii_only or (self.fast_paths and unicodedata.is_normalized('NFC', text)):
+            skipped_stages.append('unicode_nfc')
+        else:
+            text = self._normalize_unicode(text)
+        
+        # Stage 6: Collapse excessive whitespace
+        if self.fast_paths and '  ' not in text and '\n\n\n' not in text:
+            # No run to collapse; only the strip is left
+            skipped_stages.append('whitespace_runs')
+            text = text.strip()
+        else:
+            text = self._normalize_whitespace(text)
         
-        metadata['final_length'] = len(cleaned)
+        return text
+    
+    def _finish_metadata(self, metadata: Dict[str, any], counts: Dict[str, int], final_length: int):
+        """Record per-stage counts, lengths and stats for one sanitized input."""
+        for label, category in self.CHARACTER_STAGES:
+            count = counts.get(category, 0)
+            if count > 0:
+                metadata['threats_detected'].append(f"{label}: {count}")
+                metadata[category] = count
+                self.stats.increment(category, count)
+        
+        metadata['final_length'] = final_length
         metadata['reduction_percent'] = round(
-            100 * (1 - len(cleaned) / len(untrusted_input)), 2
+            100 * (1 - final_length / metadata['original_length']), 2
         )
         
         # Log if significant threats were detected
         if metadata['threats_detected']:
             logger.warning(f"Threats detected in input: {metadata['threats_detected']}")
-        
-        return cleaned, metadata
     
-    def _remove_hidden_chars(self, text: str) -> Tuple[str, int]:
+    def _clean_characters(self, text: str) -> Tuple[str, Dict[str, int]]:
         """
-        Remove zero-width and other invisible characters.
-        
-        These characters are INVISIBLE to humans but AI reads them.
-        Attackers use them to hide commands like:
-        "Summarize page​​​​IGNORE PREVIOUS INSTRUCTIONS"
-                        ^^^^^ (invisible zero-width spaces)
+        Run cleaning stages 1-4 in a single translation pass.
+        
+        1. Hidden characters: zero-width characters are INVISIBLE to humans
+           but AI reads them ("Summarize page​​IGNORE PREVIOUS INSTRUCTIONS").
+        2. Control characters: NULL, ESC, Bell and the rest of 0x00-0x1F
+           (except \\t, \\n, \\r) confuse tokenization and hide commands
+           from human reviewers.
+        3. Lookalikes: "Dеlete files" with a Cyrillic 'е' looks innocent to
+           humans but AI interprets it; homoglyphs become their Latin twin.
+        4. Leetspeak: "1gn0r3 pr3v10u5 1n5truct10n5" becomes "ignore
+           previous instructions" so the detector can see the pattern.
+        
+        One regex scan counts the affected characters per stage and one
+        str.translate() applies every removal and replacement. The stages
+        touch disjoint characters and no replacement feeds another stage,
+        so this matches running them one after the other.
         
         Returns:
-            Tuple of (cleaned_text, count_removed)
+            Tuple of (cleaned_text, counts) - counts maps each stage's stats
+            key to the number of characters it removed or replaced
+            (stages with nothing to do are omitted)
         """
-        original_len = len(text)
+        hits = self._character_pattern.findall(text)
+        if not hits:
+            return text, {}
         
-        # Remove all zero-width characters
-        for char in self.ZERO_WIDTH_CHARS:
-            text = text.replace(char, '')
+        counts: Dict[str, int] = {}
+        for char, count in Counter(hits).items():
+            category = self._character_categories[char]
+            counts[category] = counts.get(category, 0) + count
         
-        removed_count = original_len - len(text)
-        return text, removed_count
+        return text.translate(self._character_table), counts
     
-    def _remove_control_chars(self, text: str) -> Tuple[str, int]:
+    def _normalize_confusables(self, text: str) -> Tuple[str, int]:
         """
-        Remove suspicious control characters that shouldn't be in normal text.
+        Replace confusable characters with their ASCII skeleton.
         
-        Control characters like NULL, ESC, Bell can be used to:
-        1. Confuse tokenization
-        2. Hide commands from human reviewers
-        3. Exploit parser vulnerabilities
+        SUSPICIOUS_LOOKALIKES only knows ten Cyrillic letters; this stage
+        covers fullwidth ("Ｉｇｎｏｒｅ"), mathematical ("𝐝𝐞𝐥𝐞𝐭𝐞"), Greek
+        capitals ("ΑDΜΙΝ") and the rest of the confusables table. Characters
+        handled by stages 1-4 are left to them so their counts stay the same.
         
         Returns:
-            Tuple of (cleaned_text, count_removed)
+            Tuple of (normalized_text, count_replaced)
         """
-        original_len = len(text)
-        
-        # Remove dangerous control characters
-        for char in self.CONTROL_CHARS:
-            text = text.replace(char, '')
-        
-        # Also remove other control chars in range 0x00-0x1F (except tab, newline, carriage return)
-        # We keep \t (0x09), \n (0x0A), \r (0x0D) because they're legitimate
-        text = ''.join(
-            char for char in text 
-            if ord(char) >= 0x20 or char in ['\t', '\n', '\r']
-        )
-        
-        removed_count = original_len - len(text)
-        return text, removed_count
+        # Every confusable is non-ASCII
+        if text.isascii():
+            return text, 0
+        
+        # Imported here so callers that never sanitize don't pay for it
+        from .confusables import get_confusable_table
+        table = get_confusable_table()
+        if self._confusable_pattern is None:
+            self._confusable_pattern = self._build_confusable_pattern(table)
+        
+        replaced = 0
+        
+        def skeleton(match):
+            nonlocal replaced
+            char = match.group()
+            target = table.lookup(char)
+            if target is None:
+                return char
+            replaced += 1
+            return target
+        
+        return self._confusable_pattern.sub(skeleton, text), replaced
     
-    def _normalize_lookalikes(self, text: str) -> Tuple[str, int]:
+    def _build_confusable_pattern(self, table) -> "re.Pattern":
+        """Regex matching candidate confusables not already handled by stages 1-4."""
+        codes = [ord(char) for char in table.chars() if char not in self._character_categories]
+        return re.compile(self._character_class(codes))
+    
+    @staticmethod
+    def _character_class(codes: Iterable[int]) -> str:
         """
-        Replace visually similar characters with their Latin equivalents.
-        
-        Example attack:
-        "Dеlete files"  <- The 'е' is Cyrillic (U+0430), not Latin 'e'
+        Regex character class for the given BMP code points plus every astral one.
         
-        This makes the command look innocent to humans but AI interprets it.
-        We normalize to prevent obfuscation.
-        
-        Returns:
-            Tuple of (normalized_text, count_replaced)
+        BMP characters go in the class as ranges; astral ones (mathematical
+        alphanumerics) are covered by a single astral-plane range and must be
+        filtered by the caller. A class listing hundreds of astral characters
+        is tested one entry at a time and is ~30x slower.
         """
-        replaced_count = 0
-        
-        for suspicious, safe_replacement in self.SUSPICIOUS_LOOKALIKES.items():
-            count_before = text.count(suspicious)
-            text = text.replace(suspicious, safe_replacement)
-            replaced_count += count_before
+        runs: List[List[int]] = []
+        for code in sorted(code for code in codes if code <= 0xFFFF):
+            if runs and runs[-1][1] == code - 1:
+                runs[-1][1] = code
+            else:
+                runs.append([code, code])
         
-        return text, replaced_count
+        ranges = ''.join(
+            re.escape(chr(start)) + ('-' + re.escape(chr(end)) if end > start else '')
+            for start, end in runs
+        )
+        return '[' + ranges + '\\U00010000-\\U0010FFFF]'
     
-    def _normalize_leetspeak(self, text: str) -> Tuple[str, int]:
+    def _clean_character_views(self, text: str) -> Tuple[str, str, Dict[str, int]]:
         """
-        Normalize leetspeak (1337 speak) obfuscation to make attacks detectable.
-        
-        Example attacks:
-        - "1gn0r3 pr3v10u5 1n5truct10n5" → "ignore previous instructions"
-        - "d3l3t3 f1l35" → "delete files"
-        - "byp@$$ s3cur1ty" → "bypass security"
+        Stages 0-4 for the detection view and the agent view in one traversal.
         
-        This converts common leetspeak substitutions back to normal letters,
-        making injection patterns visible to the detector.
+        A single regex split finds every character any of these stages would
+        touch. The detection view maps each one exactly as stages 0-4 do; the
+        agent view only drops hidden and control characters. Both views are
+        joins of the same untouched runs.
         
         Returns:
-            Tuple of (normalized_text, count_replaced)
+            Tuple of (detection_text, agent_text, counts) - the two texts are
+            the same object when no character was folded; counts as from
+            _clean_characters() plus confusables_normalized
         """
-        replaced_count = 0
-        normalized = []
-        
-        # Process character by character to count replacements
-        for char in text:
-            if char in self.LEETSPEAK_MAP:
-                normalized.append(self.LEETSPEAK_MAP[char])
-                replaced_count += 1
+        if self._view_tables is None:
+            self._view_tables = self._build_view_tables()
+        pattern, detection_map, stage_categories = self._view_tables
+        
+        pieces = pattern.split(text)
+        if len(pieces) == 1:
+            return text, text, {}
+        
+        specials = pieces[1::2]
+        counts: Dict[str, int] = {}
+        for char, count in Counter(specials).items():
+            # Astral characters that are not confusables map to nothing
+            for category in stage_categories.get(char, ()):
+                counts[category] = counts.get(category, 0) + count
+        
+        detection_pieces = pieces[:]
+        detection_pieces[1::2] = [detection_map.get(char, char) for char in specials]
+        detection_text = ''.join(detection_pieces)
+        
+        if counts.keys() <= self.REMOVAL_CATEGORIES:
+            return detection_text, detection_text, counts
+        
+        pieces[1::2] = ['' if detection_map.get(char) == '' else char for char in specials]
+        return detection_text, ''.join(pieces), counts
+    
+    def _build_view_tables(self):
+        """Replacement and category maps for _clean_character_views()."""
+        from .confusables import get_confusable_table
+        table = get_confusable_table()
+        
+        detection_map: Dict[str, str] = {}
+        stage_categories: Dict[str, Tuple[str, ...]] = {}
+        for char, category in self._character_categories.items():
+            detection_map[char] = self._character_table[ord(char)] or ''
+            stage_categories[char] = (category,)
+        
+        for char in table.chars():
+            if char in self._character_categories:
+                continue
+            target = table.lookup(char)
+            categories = ('confusables_normalized',)
+            # Folded digits and symbols go on through leetspeak, as in sanitize()
+            if target in self._character_categories:
+                categories += (self._character_categories[target],)
+                target = self._character_table[ord(target)]
+            detection_map[char] = target
+            stage_categories[char] = categories
+        
+        pattern = re.compile('(' + self._character_class(map(ord, detection_map)) + ')')
+        return pattern, detection_map, stage_categories
+    
+    def _build_character_tables(self):
+        """Precompute the stage 1-4 translation table, char categories and scan regex."""
+        categories: Dict[str, str] = {}
+        for char in self.ZERO_WIDTH_CHARS:
+            categories[char] = 'zero_width_removed'
+        # All of 0x00-0x1F except the legitimate \t (0x09), \n (0x0A), \r (0x0D)
+        c0_controls = {chr(code) for code in range(0x20)} - {'\t', '\n', '\r'}
+        for char in self.CONTROL_CHARS | c0_controls:
+            categories[char] = 'control_chars_removed'
+        for char in self.SUSPICIOUS_LOOKALIKES:
+            categories[char] = 'lookalikes_normalized'
+        for char in self.LEETSPEAK_MAP:
+            categories[char] = 'leetspeak_normalized'
+        
+        table: Dict[int, Optional[str]] = {}
+        for char, category in categories.items():
+            if category == 'lookalikes_normalized':
+                table[ord(char)] = self.SUSPICIOUS_LOOKALIKES[char]
+            elif category == 'leetspeak_normalized':
+                table[ord(char)] = self.LEETSPEAK_MAP[char]
             else:
-                normalized.append(char)
+                table[ord(char)] = None
         
-        return ''.join(normalized), replaced_count
+        pattern = re.compile('[' + ''.join(re.escape(char) for char in sorted(categories)) + ']')
+        return table, categories, pattern
     
     def _normalize_unicode(self, text: str) -> str:
         """
@@ -308,28 +774,118 @@ class ContextualIsolator:
         Example attack:
         "Good content here...          [1000 spaces]          DELETE FILES"
         """
-        # Replace multiple spaces with single space
-        text = re.sub(r' {2,}', ' ', text)
-        
-        # Replace multiple newlines with max 2 newlines
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = self._collapse_whitespace(text)
         
         # Strip leading/trailing whitespace
         text = text.strip()
         
         return text
     
+    @classmethod
+    def _collapse_whitespace(cls, text: str) -> str:
+        """Collapse space runs to one space and newline runs to at most two."""
+        # Replace multiple spaces with single space
+        text = cls.SPACE_RUN.sub(' ', text)
+        
+        # Replace multiple newlines with max 2 newlines
+        text = cls.NEWLINE_RUN.sub('\n\n', text)
+        
+        return text
+    
     def get_stats(self) -> Dict[str, int]:
         """
         Get statistics about sanitization operations.
         Useful for monitoring and detecting attack patterns.
         """
-        return self.stats.copy()
+        return self.stats.snapshot()
+    
+    def get_cache_stats(self) -> Dict[str, float]:
+        """Result cache hits, misses, evictions, size and hit rate ({} if disabled)."""
+        return self.cache.get_stats() if self.cache is not None else {}
     
     def reset_stats(self):
         """Reset statistics counters."""
-        for key in self.stats:
-            self.stats[key] = 0
+        self.stats.reset()
+
+
+class _WhitespaceTail:
+    """
+    Whitespace held back by sanitize_stream(), as [block, repeat] runs.
+    
+    Padding is usually one character or a short pattern repeated (tabs,
+    " \n" pairs). Cut into fixed BLOCK-sized blocks with repeats counted,
+    such a tail stays a few entries long whatever its length. Past
+    ``max_runs`` entries the runs are written out to a spooled temporary
+    file (in memory up to ``spill_size`` bytes, then on disk).
+    """
+    
+    BLOCK = 60  # A multiple of every pattern length up to 6
+    
+    def __init__(self, max_runs: int, spill_size: int):
+        self.max_runs = max_runs
+        self.spill_size = spill_size
+        self.runs: List[list] = []
+        self.partial = ''
+        self._spill = None  # Oldest held text, once the runs overflowed
+    
+    def add(self, text: str):
+        text = self.partial + text
+        full = len(text) - len(text) % self.BLOCK
+        for start in range(0, full, self.BLOCK):
+            block = text[start:start + self.BLOCK]
+            if self.runs and self.runs[-1][0] == block:
+                self.runs[-1][1] += 1
+            else:
+                self.runs.append([block, 1])
+        self.partial = text[full:]
+        
+        if len(self.runs) > self.max_runs:
+            if self._spill is None:
+                self._spill = tempfile.SpooledTemporaryFile(
+                    max_size=self.spill_size, mode='w+', encoding='utf-8',
+                    errors='surrogatepass', newline=''
+                )
+            for piece in self._expand(self.runs):
+                self._spill.write(piece)
+            self.runs = []
+    
+    @staticmethod
+    def _expand(runs: List[list]) -> Iterator[str]:
+        for block, repeat in runs:
+            for start in range(0, repeat, 128):
+                yield block * min(128, repeat - start)
+    
+    def drain(self) -> Iterator[str]:
+        """Yield the held text in bounded pieces and empty the tail."""
+        spill, runs, partial = self._spill, self.runs, self.partial
+        self._spill, self.runs, self.partial = None, [], ''
+        if spill is not None:
+            spill.seek(0)
+            with spill:
+                yield from iter(lambda: spill.read(8192), '')
+        yield from self._expand(runs)
+        if partial:
+            yield partial
+
+
+# === PARALLEL WORKERS ===
+# Used by ContextualIsolator.sanitize_many(); module-level so they pickle
+
+_worker_isolator: Optional[ContextualIsolator] = None
+
+
+def _init_worker(max_length: int, fast_paths: bool):
+    """Create the isolator each worker process reuses for all its batches."""
+    global _worker_isolator
+    _worker_isolator = ContextualIsolator(max_length=max_length, fast_paths=fast_paths)
+
+
+def _sanitize_batch(texts: List[str]) -> Tuple[List[Tuple[str, Dict[str, any]]], Dict[str, int]]:
+    """Sanitize one batch; return the results and the stats they added."""
+    results = [_worker_isolator.sanitize(text) for text in texts]
+    worker_stats = _worker_isolator.stats.snapshot()
+    _worker_isolator.stats.reset()
+    return results, worker_stats
 
 
 # === CONVENIENCE FUNCTION ===
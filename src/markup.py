@@ -0,0 +1,319 @@
+"""
+Markup Extraction Module
+========================
+This module turns untrusted HTML into plain text before it reaches the
+isolator and the detector, keeping what a human would SEE apart from
+what only the model would read.
+
+Key Threats Addressed:
+1. Hidden Elements: display:none spans, hidden attributes, aria-hidden
+2. Comments: <!-- AI agents: ignore previous instructions -->
+3. Attribute Payloads: alt/title/aria-label text shown only to machines
+4. Huge Pages: multi-megabyte bodies designed to exhaust memory
+5. Padding: kilobytes of CSS or script placed before a hidden payload
+
+The parser is event-based (html.parser): text is routed to a channel as
+each piece is parsed and no DOM tree is built. Memory is bounded by the
+open-element stack (MAX_DEPTH) and the pending-markup buffer
+(MAX_PENDING). scan_html() spools each channel (spilling to a temporary
+file past SPOOL_MAX_MEMORY) and then streams the whole channel through
+the isolator and the detector, so nothing is cut off unscanned.
+
+Author: Intense Sieve Security Team
+"""
+
+import html
+import re
+import logging
+import tempfile
+from collections import deque
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Text channels: what is rendered vs. content only a machine reads
+VISIBLE = "visible"
+HIDDEN = "hidden"
+COMMENT = "comment"
+ATTRIBUTE = "attribute"
+CODE = "code"
+CHANNELS = (VISIBLE, HIDDEN, COMMENT, ATTRIBUTE, CODE)
+
+# Bytes of channel text scan_html() keeps in memory before spilling to disk
+SPOOL_MAX_MEMORY = 1 << 20
+SPOOL_READ_CHARS = 8192
+
+
+class HTMLChannelExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text extractor that separates content channels.
+
+    Usage:
+        extractor = HTMLChannelExtractor()
+        for chunk in body_chunks:
+            extractor.feed(chunk)
+            for channel, text in extractor.pop_events():
+                ...
+        extractor.close()
+        remaining = extractor.pop_events()
+    """
+
+    # Elements whose content is never rendered
+    HIDDEN_TAGS = {'template', 'noscript', 'head', 'title'}
+
+    # Script and stylesheet source: never rendered, and kept out of the
+    # hidden channel so bulky code cannot dilute or pad it
+    CODE_TAGS = {'script', 'style'}
+
+    # Elements without content (never pushed on the stack)
+    VOID_TAGS = {
+        'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+        'link', 'meta', 'param', 'source', 'track', 'wbr',
+    }
+
+    # Elements that start a new line of visible text
+    BLOCK_TAGS = {
+        'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl',
+        'dt', 'figcaption', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+        'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+        'table', 'td', 'th', 'tr', 'ul',
+    }
+
+    # Attributes whose values are text a model may read
+    TEXT_ATTRIBUTES = {
+        'alt', 'title', 'aria-label', 'aria-description', 'placeholder',
+        'content', 'value', 'summary', 'label',
+    }
+
+    # Inline styles that hide an element from humans
+    HIDING_STYLE = re.compile(
+        r'display\s*:\s*none|visibility\s*:\s*hidden|opacity\s*:\s*0(?:\.0+)?\s*(?:;|$)'
+        r'|font-size\s*:\s*0+(?:px|em|rem|pt|%)?\s*(?:;|$)',
+        re.IGNORECASE
+    )
+
+    # Bounds on parser state, whatever the page size
+    MAX_DEPTH = 256
+    MAX_PENDING = 65536
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        # (tag, channel) per open element; the channel is inherited, so
+        # dropping the oldest entries on very deep pages keeps the current state
+        self._stack: deque = deque(maxlen=self.MAX_DEPTH)
+        # (channel, pieces) runs, joined once when popped
+        self._events: List[Tuple[str, List[str]]] = []
+        self.flushed_pending = 0
+
+    # === EVENT OUTPUT ===
+
+    def _emit(self, channel: str, text: str):
+        if not text:
+            return
+        if self._events and self._events[-1][0] == channel:
+            self._events[-1][1].append(text)
+        else:
+            self._events.append((channel, [text]))
+
+    def pop_events(self) -> List[Tuple[str, str]]:
+        """Return and clear the (channel, text) pieces parsed so far."""
+        events, self._events = self._events, []
+        return [(channel, ''.join(pieces)) for channel, pieces in events]
+
+    @property
+    def _channel(self) -> str:
+        return self._stack[-1][1] if self._stack else VISIBLE
+
+    # === PARSER CALLBACKS ===
+
+    def feed(self, data: str):
+        super().feed(data)
+        # Unterminated markup (a huge "<!--" or inline script) would be
+        # buffered forever; nothing renders it, so flush it as hidden text
+        if len(self.rawdata) > self.MAX_PENDING:
+            self.flushed_pending += len(self.rawdata)
+            self._emit(CODE if self.cdata_elem else HIDDEN, self.rawdata)
+            self.rawdata = ''
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag in self.CODE_TAGS:
+            channel = CODE
+        elif (
+            self._channel != VISIBLE
+            or tag in self.HIDDEN_TAGS
+            or 'hidden' in attributes
+            or (attributes.get('aria-hidden') or '').lower() == 'true'
+            or bool(self.HIDING_STYLE.search(attributes.get('style') or ''))
+        ):
+            channel = HIDDEN
+        else:
+            channel = VISIBLE
+        is_hidden_input = tag == 'input' and (attributes.get('type') or '').lower() == 'hidden'
+
+        for name, value in attrs:
+            if value and name in self.TEXT_ATTRIBUTES:
+                self._emit(HIDDEN if is_hidden_input else ATTRIBUTE, value + '\n')
+
+        if tag in self.BLOCK_TAGS and channel == VISIBLE:
+            self._emit(VISIBLE, '\n')
+        if tag not in self.VOID_TAGS:
+            self._stack.append((tag, channel))
+
+    def handle_startendtag(self, tag, attrs):
+        # <div/> opens and closes at once
+        self.handle_starttag(tag, attrs)
+        if tag not in self.VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Close the innermost matching element (and anything left open inside it)
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                while len(self._stack) > depth:
+                    self._stack.pop()
+                break
+        if tag in self.BLOCK_TAGS and self._channel == VISIBLE:
+            self._emit(VISIBLE, '\n')
+
+    def handle_data(self, data):
+        self._emit(self._channel, data)
+
+    def handle_entityref(self, name):
+        self.handle_data(html.unescape(f'&{name};'))
+
+    def handle_charref(self, name):
+        self.handle_data(html.unescape(f'&#{name};'))
+
+    def handle_comment(self, data):
+        self._emit(COMMENT, data + '\n')
+
+
+def extract_html(chunks: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (channel, text) pieces from HTML delivered in chunks.
+
+    Usage:
+        for channel, text in extract_html(response_chunks):
+            ...
+    """
+    extractor = HTMLChannelExtractor()
+    for chunk in chunks:
+        extractor.feed(chunk)
+        yield from extractor.pop_events()
+    extractor.close()
+    yield from extractor.pop_events()
+    if extractor.flushed_pending:
+        logger.warning(f"Flushed {extractor.flushed_pending} chars of unterminated markup as unrendered text")
+
+
+def collect_channels(chunks: Iterable[str], max_chars: int = 10000) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    Extract HTML into per-channel text, keeping at most max_chars per channel.
+
+    Text past the cap is only counted; use scan_html() to scan whole channels.
+
+    Returns:
+        Tuple of (channel_texts, dropped_chars)
+        - channel_texts: Text per channel in CHANNELS
+        - dropped_chars: Characters beyond max_chars not kept, per channel
+    """
+    parts: Dict[str, List[str]] = {channel: [] for channel in CHANNELS}
+    kept = dict.fromkeys(CHANNELS, 0)
+    dropped = dict.fromkeys(CHANNELS, 0)
+
+    for channel, text in extract_html(chunks):
+        room = max_chars - kept[channel]
+        if room > 0:
+            parts[channel].append(text[:room])
+            kept[channel] += min(room, len(text))
+        dropped[channel] += max(0, len(text) - max(room, 0))
+
+    return {channel: ''.join(pieces) for channel, pieces in parts.items()}, dropped
+
+
+def _read_spool(spool) -> Iterator[str]:
+    """Stream a spooled channel back from the start in bounded pieces."""
+    spool.seek(0)
+    return iter(lambda: spool.read(SPOOL_READ_CHARS), '')
+
+
+def scan_html(chunks: Iterable[str], isolator, detector,
+              max_chars: Optional[int] = None) -> Tuple[str, List, float, Dict[str, Any]]:
+    """
+    Extract an HTML page and run every channel through sanitize and analyze.
+
+    The visible channel becomes the text for the agent; hidden, comment,
+    attribute and code channels are only analyzed, so injections hidden
+    there are still caught without being shown to the agent.
+
+    Every channel is scanned whole with sanitize_stream() and
+    analyze_stream(): a payload placed after kilobytes of padding is
+    found just like one at the top of the page. Only the agent's view of
+    the visible channel is cut at max_chars.
+
+    Args:
+        chunks: HTML body as an iterable of str chunks (a str also works)
+        isolator: ContextualIsolator
+        detector: InjectionDetector
+        max_chars: Cap on the visible text returned (default: isolator.max_length)
+
+    Returns:
+        Tuple of (visible_text, threats, overall_risk, metadata)
+        - visible_text: Agent view of the visible channel
+        - threats: ThreatSignals from all channels
+        - overall_risk: Max risk over all channels
+        - metadata: Per-channel 'risk', 'threat_types' and sanitize counts,
+          plus 'dropped_chars' (visible characters beyond max_chars)
+    """
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    if max_chars is None:
+        max_chars = isolator.max_length
+
+    spools: Dict[str, tempfile.SpooledTemporaryFile] = {}
+    visible_length = 0
+    has_text = set()
+
+    try:
+        for channel, text in extract_html(chunks):
+            spool = spools.get(channel)
+            if spool is None:
+                spool = spools[channel] = tempfile.SpooledTemporaryFile(
+                    max_size=SPOOL_MAX_MEMORY, mode='w+', encoding='utf-8',
+                    errors='surrogatepass', newline=''
+                )
+            spool.write(text)
+            if channel == VISIBLE:
+                visible_length += len(text)
+            if channel not in has_text and text.strip():
+                has_text.add(channel)
+
+        metadata: Dict[str, Any] = {'dropped_chars': max(0, visible_length - max_chars)}
+        threats: List = []
+        overall_risk = 0.0
+        visible_text = ''
+
+        for channel in CHANNELS:
+            if channel not in has_text:
+                continue
+            sanitize_metadata: Dict[str, Any] = {}
+            cleaned = isolator.sanitize_stream(_read_spool(spools[channel]), sanitize_metadata)
+            channel_threats = list(detector.analyze_stream(cleaned))
+            risk = min(1.0, max((threat.severity for threat in channel_threats), default=0.0))
+            threats.extend(channel_threats)
+            overall_risk = max(overall_risk, risk)
+            metadata[channel] = dict(
+                sanitize_metadata,
+                risk=risk,
+                threat_types=[threat.threat_type for threat in channel_threats],
+            )
+            if channel == VISIBLE:
+                spools[channel].seek(0)
+                _, visible_text, _ = isolator.sanitize_views(spools[channel].read(max_chars))
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+    return visible_text, threats, overall_risk, metadata
@@ -0,0 +1,494 @@
+"""
+Multi-Pattern Matching Engine
+=============================
+This module provides the matching primitives used by the detectors.
+
+The detector holds roughly forty-five regular expressions split across three
+families (injection phrases, boundary markers, social engineering). Running
+``finditer`` once per pattern rescans every character of the input for every
+pattern. The engine here scans the text ONCE for the literal prefixes that
+every match must start with, and only tries the full patterns at those
+candidate positions.
+
+The module also provides ``KeywordAutomaton``, which finds single-word and
+multi-word command keywords ("delete", "turn off", "act as") in one pass.
+
+Linear-time guarantee:
+Patterns shaped like ``A.+B.+C`` backtrack quadratically (or worse) on
+attacker-controlled text with many A's and B's but no C. Such patterns are
+compiled into a ``GapPattern``, which finds each segment with its own
+search and never revisits a line, so every pattern costs O(len(text)).
+``scan`` also accepts a deadline and raises ``TimeBudgetExceeded`` once it
+is passed.
+
+How the pattern engine works:
+1. Each pattern is parsed and its set of leading literals is extracted
+   ("ignore", "boss", "###", ...).
+2. All leading literals are merged into one prefilter regex that reports
+   every position where any of them starts.
+3. At each candidate position only the patterns whose leading literal can
+   start with that character are tried with an anchored ``match``.
+
+Results are identical to running ``finditer`` per pattern: every pattern
+reports the same non-overlapping matches, in the same order.
+
+Author: Intense Sieve Security Team
+"""
+
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+    from re import _constants as sre_constants
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse
+    import sre_constants
+
+
+# A match reported by the engine: (family, pattern_index, match_object)
+PatternHit = Tuple[str, int, "re.Match"]
+
+# A keyword occurrence: (start, end, keyword)
+KeywordHit = Tuple[int, int, str]
+
+# How many candidate positions are tried between two deadline checks
+DEADLINE_CHECK_INTERVAL = 64
+
+
+class TimeBudgetExceeded(Exception):
+    """Raised when a scan runs past the caller's deadline."""
+    pass
+
+
+def _leading_literals(items) -> Optional[Set[str]]:
+    """
+    Compute the set of literal strings that any match of ``items`` starts with.
+
+    Returns None when the pattern can start with an arbitrary character
+    (character classes, ``.``, anchors), in which case it cannot be
+    prefiltered. An empty string in the result means the sequence can
+    match without consuming a literal first.
+    """
+    items = list(items)
+    if not items:
+        return {''}
+
+    op, av = items[0]
+
+    if op is sre_constants.LITERAL:
+        # Collect the run of consecutive literals as one prefix
+        run = []
+        for item_op, item_av in items:
+            if item_op is not sre_constants.LITERAL:
+                break
+            run.append(chr(item_av))
+        return {''.join(run).lower()}
+
+    if op is sre_constants.IN:
+        # A class of plain literals ([:;]) is still a set of prefixes
+        if all(member_op is sre_constants.LITERAL for member_op, _ in av):
+            return {chr(code).lower() for _, code in av}
+        return None
+
+    if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        # Lookarounds consume nothing: the prefix is whatever follows them
+        return _leading_literals(items[1:])
+
+    if op is sre_constants.SUBPATTERN:
+        head = _leading_literals(av[-1])
+    elif op is sre_constants.BRANCH:
+        head = set()
+        for alternative in av[1]:
+            branch = _leading_literals(alternative)
+            if branch is None:
+                return None
+            head |= branch
+    elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+        min_count, _, sub = av
+        head = _leading_literals(sub)
+        if head is not None and min_count == 0:
+            head = head | {''}
+    else:
+        # ANY, CATEGORY, AT, lookarounds, group references...
+        return None
+
+    if head is None:
+        return None
+
+    # Optional heads fall through to whatever follows them
+    if '' in head:
+        rest = _leading_literals(items[1:])
+        if rest is None:
+            return None
+        head = (head - {''}) | rest
+
+    return head
+
+
+def _trie_regex(literals: Set[str], space: Optional[str] = None) -> str:
+    """
+    Build a regex alternation of ``literals`` factored by common prefix.
+
+    A flat ``ignore|if|it|...`` makes the regex engine retry every branch at
+    every position. The trie form (``i(?:gnore|f|t)``) rejects a position
+    after a single character comparison.
+
+    Args:
+        literals: Strings to match
+        space: Optional regex used in place of a literal space (e.g. ``\\s+``)
+    """
+    trie: Dict[str, dict] = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [
+            (space if space and char == ' ' else re.escape(char)) + emit(node[char])
+            for char in sorted(node) if char
+        ]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A literal ends here, so the longer continuations are optional
+        if '' in node:
+            body = f'(?:{body})?'
+        return body
+
+    return emit(trie)
+
+
+def _split_gaps(pattern: str) -> List[str]:
+    """
+    Split ``pattern`` at every top-level ``.+`` (outside groups and classes).
+
+    Returns a single-item list when the pattern has no top-level gap.
+    """
+    segments = []
+    depth = 0
+    in_class = False
+    start = 0
+    i = 0
+
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            # A ']' right after '[' or '[^' is a literal member
+            if pattern[i + 1:i + 2] == '^':
+                i += 1
+            if pattern[i + 1:i + 2] == ']':
+                i += 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and pattern.startswith('.+', i) and pattern[i + 2:i + 3] not in ('?', '+'):
+            segments.append(pattern[start:i])
+            start = i + 2
+            i += 2
+            continue
+        i += 1
+
+    segments.append(pattern[start:])
+    return segments
+
+
+class GapMatch:
+    """Match result of a GapPattern (same span API as re.Match)."""
+
+    __slots__ = ('string', '_start', '_end')
+
+    def __init__(self, string: str, start: int, end: int):
+        self.string = string
+        self._start = start
+        self._end = end
+
+    def group(self, index: int = 0) -> str:
+        if index != 0:
+            raise IndexError("GapMatch only exposes group 0")
+        return self.string[self._start:self._end]
+
+    def start(self) -> int:
+        return self._start
+
+    def end(self) -> int:
+        return self._end
+
+    def span(self) -> Tuple[int, int]:
+        return self._start, self._end
+
+    def __repr__(self):
+        return f"<GapMatch span={self.span()} match={self.group(0)!r}>"
+
+
+class GapPattern:
+    """
+    Linear-time matcher for regexes of the form ``S0.+S1.+...Sn``.
+
+    Backtracking engines try every split of every ``.+`` gap, which is
+    quadratic or worse when the text has many S0/S1 but no Sn. Here each
+    segment is found with its own forward search: S0 at the start position,
+    then the first S1 starting at least one character after it, and so on.
+    The span reported is the one the greedy regex would report: from S0 to
+    the last Sn on the line.
+
+    Since ``.`` does not match newlines (without re.DOTALL), a match never
+    crosses a line. If the chain fails from some S0 on a line, it also fails
+    from every later S0 on that line that ends no earlier, so ``match``
+    can remember the failure and answer those candidates in O(1).
+    """
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.pattern = pattern
+        self.flags = flags
+        self.segments = [re.compile(segment, flags) for segment in _split_gaps(pattern)]
+        self._dotall = bool(flags & re.DOTALL)
+
+    def _line_end(self, text: str, pos: int) -> int:
+        if self._dotall:
+            return len(text)
+        newline = text.find('\n', pos)
+        return len(text) if newline == -1 else newline
+
+    def match(self, text: str, pos: int = 0, memo: Optional[dict] = None) -> Optional[GapMatch]:
+        """
+        Match the pattern starting exactly at ``pos``.
+
+        Args:
+            text: Text to match against
+            pos: Start position
+            memo: Optional dict reused across calls on the same text with
+                  increasing ``pos``; it records failed lines
+        """
+        head = self.segments[0].match(text, pos)
+        if not head:
+            return None
+
+        line_end = self._line_end(text, pos)
+        if memo is not None and memo.get('line_end') == line_end and head.end() >= memo['failed_end']:
+            return None
+
+        # Earliest chain: each segment starts at least one char after the previous
+        bound = head.end()
+        for segment in self.segments[1:-1]:
+            found = segment.search(text, bound + 1, line_end)
+            if not found:
+                break
+            bound = found.end()
+        else:
+            # Greedy gaps: the match ends at the last final segment on the line
+            last = None
+            for last in self.segments[-1].finditer(text, bound + 1, line_end):
+                pass
+            if last is not None:
+                return GapMatch(text, pos, last.end())
+
+        if memo is not None:
+            memo['line_end'] = line_end
+            memo['failed_end'] = head.end()
+        return None
+
+    def finditer(self, text: str) -> Iterator[GapMatch]:
+        """Yield non-overlapping matches left to right, like re.finditer."""
+        memo: dict = {}
+        pos = 0
+        while True:
+            head = self.segments[0].search(text, pos)
+            if not head:
+                return
+            found = self.match(text, head.start(), memo)
+            if found:
+                yield found
+                pos = max(found.end(), head.start() + 1)
+            else:
+                pos = head.start() + 1
+
+
+def compile_linear(pattern: str, flags: int = 0) -> Union[re.Pattern, GapPattern]:
+    """Compile ``pattern``, using a GapPattern when it has top-level ``.+`` gaps."""
+    if len(_split_gaps(pattern)) > 1:
+        return GapPattern(pattern, flags)
+    return re.compile(pattern, flags)
+
+
+class MultiPatternMatcher:
+    """
+    Scan text once for several families of regexes.
+
+    Usage:
+        matcher = MultiPatternMatcher([
+            ("injection_phrase", INJECTION_PHRASES),
+            ("context_boundary", BOUNDARY_MARKERS),
+        ], flags=re.IGNORECASE)
+        for family, index, match in matcher.scan(text):
+            ...
+
+    Patterns whose leading literals cannot be determined (for example
+    ``^\\s*\\*{3,}``) fall back to their own ``finditer`` scan, so adding a
+    new pattern never changes what is detected. Patterns with ``.+`` gaps
+    are compiled with ``compile_linear`` so no pattern can backtrack
+    super-linearly.
+    """
+
+    def __init__(self, families: Sequence[Tuple[str, Sequence[str]]], flags: int = 0):
+        self.families = [name for name, _ in families]
+        self.flags = flags
+
+        # Flat list of (family, index, compiled_pattern)
+        self._patterns: List[Tuple[str, int, Union[re.Pattern, GapPattern]]] = []
+        # Patterns that cannot be prefiltered (scanned with finditer)
+        self._unanchored: List[int] = []
+        # First character of a leading literal -> pattern slots to try
+        self._buckets: Dict[str, List[int]] = {}
+        self._anchored: List[int] = []
+
+        literals: Set[str] = set()
+
+        for family, patterns in families:
+            for index, pattern in enumerate(patterns):
+                slot = len(self._patterns)
+                compiled = compile_linear(pattern, flags)
+                self._patterns.append((family, index, compiled))
+
+                try:
+                    leads = _leading_literals(sre_parse.parse(pattern, flags))
+                except Exception:
+                    leads = None
+
+                if not leads or '' in leads:
+                    self._unanchored.append(slot)
+                    continue
+
+                self._anchored.append(slot)
+                literals |= leads
+                for first_char in {lead[0] for lead in leads}:
+                    self._buckets.setdefault(first_char, []).append(slot)
+
+        # One zero-width scan reports every position where any literal starts
+        if literals:
+            self._prefilter = re.compile(f'(?={_trie_regex(literals)})', flags)
+        else:
+            self._prefilter = None
+
+    @property
+    def pattern_count(self) -> int:
+        """Total number of patterns across all families."""
+        return len(self._patterns)
+
+    def scan(self, text: str, deadline: Optional[float] = None) -> List[PatternHit]:
+        """
+        Find every match of every pattern in a single pass over ``text``.
+
+        Args:
+            text: Text to scan
+            deadline: Optional time.perf_counter() value; the scan raises
+                      TimeBudgetExceeded once it is passed
+
+        Returns:
+            List of (family, pattern_index, match) ordered by family (in the
+            order given to the constructor), then pattern index, then position.
+            This is the same order as looping ``finditer`` over each pattern.
+        """
+        hits_by_slot: Dict[int, List["re.Match"]] = {}
+
+        if self._prefilter is not None:
+            next_allowed = [0] * len(self._patterns)
+            buckets = self._buckets
+            anchored = self._anchored
+            patterns = self._patterns
+            # Per-pattern memo of failed lines for GapPatterns
+            memos = {
+                slot: {} for slot in anchored if isinstance(patterns[slot][2], GapPattern)
+            }
+
+            for count, candidate in enumerate(self._prefilter.finditer(text)):
+                if deadline is not None and count % DEADLINE_CHECK_INTERVAL == 0:
+                    if time.perf_counter() > deadline:
+                        raise TimeBudgetExceeded(f"pattern scan exceeded deadline at position {candidate.start()}")
+
+                pos = candidate.start()
+                # Unusual case-folds (e.g. U+017F 'ſ' matching 's') try everything
+                slots = buckets.get(text[pos].lower(), anchored)
+
+                for slot in slots:
+                    # Keep finditer semantics: matches of one pattern never overlap
+                    if next_allowed[slot] > pos:
+                        continue
+                    if slot in memos:
+                        match = patterns[slot][2].match(text, pos, memos[slot])
+                    else:
+                        match = patterns[slot][2].match(text, pos)
+                    if match:
+                        hits_by_slot.setdefault(slot, []).append(match)
+                        next_allowed[slot] = max(match.end(), pos + 1)
+
+        for slot in self._unanchored:
+            if deadline is not None and time.perf_counter() > deadline:
+                raise TimeBudgetExceeded("pattern scan exceeded deadline")
+            found = list(self._patterns[slot][2].finditer(text))
+            if found:
+                hits_by_slot[slot] = found
+
+        hits: List[PatternHit] = []
+        for slot in sorted(hits_by_slot):
+            family, index, _ = self._patterns[slot]
+            for match in hits_by_slot[slot]:
+                hits.append((family, index, match))
+
+        return hits
+
+
+class KeywordAutomaton:
+    """
+    Prebuilt matcher for a fixed vocabulary of words and phrases.
+
+    The vocabulary is compiled once into a trie-shaped regex bounded by
+    ``\\b`` on both sides, so the regex engine walks the text a single time
+    and never retries a position more than the longest keyword. Multi-word
+    entries match across any run of whitespace ("turn   off" == "turn off").
+
+    Usage:
+        automaton = KeywordAutomaton({'delete', 'turn off', 'you are'})
+        automaton.find("please turn off and delete")
+        # [(7, 15, 'turn off'), (20, 26, 'delete')]
+    """
+
+    def __init__(self, keywords: Iterable[str], flags: int = 0):
+        # Normalize phrases to lowercase words separated by single spaces
+        self.keywords = frozenset(
+            ' '.join(keyword.lower().split()) for keyword in keywords if keyword.strip()
+        )
+        self._pattern = re.compile(
+            r'\b' + _trie_regex(set(self.keywords), space=r'\s+') + r'\b', flags
+        )
+
+    def find(self, text: str) -> List[KeywordHit]:
+        """
+        Find every keyword occurrence (leftmost, longest, non-overlapping).
+
+        Args:
+            text: Text to scan (keywords are lowercase, so pass lowered text
+                  unless the automaton was built with re.IGNORECASE)
+
+        Returns:
+            List of (start, end, keyword) in order of position
+        """
+        return [
+            (match.start(), match.end(), ' '.join(match.group(0).lower().split()))
+            for match in self._pattern.finditer(text)
+        ]
+
+    def count(self, text: str) -> Counter:
+        """Count occurrences of each keyword in ``text``."""
+        return Counter(keyword for _, _, keyword in self.find(text))
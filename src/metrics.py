@@ -0,0 +1,232 @@
+"""
+Runtime Metrics
+===============
+This module provides the counters used for monitoring the security layers.
+
+The isolator and detector are shared by every tool call (see the module-level
+``_isolator`` in tools.py), so under a threaded server many workers update
+the same statistics at once. A plain dict with ``+=`` loses updates, and a
+single global lock would serialize the hot path.
+
+``StatCounters`` gives each thread its own private shard of counters.
+Increments touch only the calling thread's shard and never take a lock;
+shards are merged only when someone reads the statistics.
+
+``LatencyHistograms`` builds fixed-bucket latency histograms on the same
+shards, and ``prometheus_text`` renders counters and histograms in the
+Prometheus text exposition format.
+
+Author: Intense Sieve Security Team
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds: regex layers take tens of
+# microseconds, the guard model whole seconds
+DEFAULT_LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class StatCounters:
+    """
+    Named integer counters sharded per thread.
+
+    Usage:
+        stats = StatCounters(['inputs_processed', 'threats_detected'])
+        stats.increment('inputs_processed')
+        stats.snapshot()  # {'inputs_processed': 1, 'threats_detected': 0}
+    """
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys: List[str] = list(dict.fromkeys(keys))
+        self._local = threading.local()
+        # Guards shard registration, merging and reset - never increments
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[threading.Thread, Dict[str, int]]] = []
+        # Totals folded in from threads that have exited
+        self._retired: Dict[str, int] = dict.fromkeys(self._keys, 0)
+
+    def _shard(self) -> Dict[str, int]:
+        """Return the calling thread's counters, registering them on first use."""
+        try:
+            return self._local.counts
+        except AttributeError:
+            counts = dict.fromkeys(self._keys, 0)
+            with self._lock:
+                # Thread churn would otherwise grow the shard list until
+                # the next read; retire exited threads as new ones arrive
+                self._retire_exited()
+                self._shards.append((threading.current_thread(), counts))
+            self._local.counts = counts
+            return counts
+
+    def _retire_exited(self):
+        """Fold shards of exited threads into the retired totals (hold _lock)."""
+        live = []
+        for thread, counts in self._shards:
+            if thread.is_alive():
+                live.append((thread, counts))
+            else:
+                for key, value in counts.items():
+                    self._retired[key] += value
+        self._shards = live
+
+    def increment(self, key: str, amount: int = 1):
+        """Add ``amount`` to counter ``key`` (lock-free, thread-local)."""
+        self._shard()[key] += amount
+
+    def merge(self, counts: Dict[str, int]):
+        """Add totals from elsewhere (e.g. a worker process) into these counters."""
+        shard = self._shard()
+        for key, value in counts.items():
+            shard[key] += value
+
+    def snapshot(self) -> Dict[str, int]:
+        """Merge all thread shards into one dict of totals."""
+        with self._lock:
+            self._retire_exited()
+            totals = dict(self._retired)
+            for _, counts in self._shards:
+                for key, value in counts.items():
+                    totals[key] += value
+            return totals
+
+    def reset(self):
+        """
+        Set every counter back to zero.
+
+        Increments racing with a reset on other threads may survive it.
+        """
+        with self._lock:
+            self._retired = dict.fromkeys(self._keys, 0)
+            for _, counts in self._shards:
+                for key in counts:
+                    counts[key] = 0
+
+    def copy(self) -> Dict[str, int]:
+        """Alias of snapshot(), for code written against the old stats dict."""
+        return self.snapshot()
+
+    def __getitem__(self, key: str) -> int:
+        return self.snapshot()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __repr__(self):
+        return f"StatCounters({self.snapshot()})"
+
+
+class LatencyHistograms(StatCounters):
+    """
+    Named fixed-bucket latency histograms, sharded per thread.
+
+    Each histogram is a row of StatCounters keys: one per bucket (plus an
+    overflow bucket), 'sum' and 'count'. An observation is a bisect and
+    three dict increments on the calling thread's shard - no lock.
+
+    Usage:
+        latency = LatencyHistograms(['detection', 'guard'])
+        latency.observe('detection', 0.00031)
+        latency.quantile('detection', 0.99)  # 0.0005 (bucket upper bound)
+    """
+
+    def __init__(self, names: Iterable[str], buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS):
+        self.names: List[str] = list(dict.fromkeys(names))
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        slots = list(range(len(self.buckets) + 1)) + ['sum', 'count']
+        super().__init__((name, slot) for name in self.names for slot in slots)
+
+    def observe(self, name: str, seconds: float):
+        """Record one duration in histogram ``name``."""
+        shard = self._shard()
+        # First bucket whose upper bound is >= seconds (Prometheus "le")
+        shard[(name, bisect_left(self.buckets, seconds))] += 1
+        shard[(name, 'sum')] += seconds
+        shard[(name, 'count')] += 1
+
+    def histograms(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Merged histograms by name.
+
+        Each has 'buckets' ([(upper_bound, cumulative_count), ...] ending
+        with +inf), 'sum' (seconds) and 'count'.
+        """
+        totals = self.snapshot()
+        result = {}
+        for name in self.names:
+            cumulative = 0
+            buckets = []
+            for slot, bound in enumerate(self.buckets + (math.inf,)):
+                cumulative += totals[(name, slot)]
+                buckets.append((bound, cumulative))
+            result[name] = {
+                'buckets': buckets,
+                'sum': totals[(name, 'sum')],
+                'count': totals[(name, 'count')],
+            }
+        return result
+
+    def quantile(self, name: str, q: float, histogram: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        """
+        Upper bound of the bucket holding quantile ``q`` (None if empty).
+
+        Bucketed data only bounds a quantile; inf means it is above the
+        largest bucket.
+        """
+        histogram = histogram if histogram is not None else self.histograms()[name]
+        if not histogram['count']:
+            return None
+        rank = q * histogram['count']
+        for bound, cumulative in histogram['buckets']:
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else f"{bound:g}"
+
+
+def prometheus_text(prefix: str, counters: Optional[Dict[str, float]] = None,
+                    histograms: Optional[Dict[str, Dict[str, Any]]] = None,
+                    histogram_name: str = 'latency_seconds', label: str = 'layer',
+                    help_text: str = '') -> str:
+    """
+    Render counters and histograms in Prometheus text exposition format.
+
+    Args:
+        prefix: Metric name prefix (e.g. 'intense_sieve')
+        counters: Counter name -> value, exported as <prefix>_<name>_total
+        histograms: LatencyHistograms.histograms() output, exported as one
+                    <prefix>_<histogram_name> family labelled by name
+        histogram_name: Histogram family name
+        label: Label carrying each histogram's name
+        help_text: HELP line for the histogram family
+
+    Returns:
+        Exposition text ending with a newline
+    """
+    lines = []
+    for key, value in (counters or {}).items():
+        metric = f"{prefix}_{key}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+
+    if histograms:
+        family = f"{prefix}_{histogram_name}"
+        if help_text:
+            lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} histogram")
+        for name, histogram in histograms.items():
+            for bound, cumulative in histogram['buckets']:
+                lines.append(f'{family}_bucket{{{label}="{name}",le="{_format_bound(bound)}"}} {cumulative}')
+            lines.append(f'{family}_sum{{{label}="{name}"}} {histogram["sum"]}')
+            lines.append(f'{family}_count{{{label}="{name}"}} {histogram["count"]}')
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,278 @@
+"""
+Guard Call Resilience
+=====================
+This module keeps a slow or failing guard model from stalling validation.
+
+``self.guard.invoke`` used to have no deadline: one stalled Ollama call
+froze the whole pipeline, and a degraded model slowed every request.
+``GuardResilience`` wraps each guard call with:
+1. A per-call deadline (``timeout``)
+2. A hedged second request once the first has run longer than the recent
+   p95 latency, answered by whichever request finishes first
+3. A circuit breaker that stops calling the guard after repeated failures
+   and lets a single trial request through after ``reset_timeout``
+
+When no verdict is available it raises ``GuardUnavailable`` with a reason;
+IntentSieve then decides from the heuristic layers alone.
+
+Author: Intense Sieve Security Team
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+
+from .metrics import StatCounters
+
+
+class GuardUnavailable(Exception):
+    """The guard gave no verdict (timeout, error or open circuit)."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed -> open after failure_threshold consecutive failures;
+    open -> half_open after reset_timeout seconds (one trial call allowed);
+    half_open -> closed on success, back to open on failure. A trial that
+    has not reported back within reset_timeout is presumed lost and
+    another trial call is allowed.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a guard call may be made now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                # Trial call; everyone else waits for its outcome
+                self.state = self.HALF_OPEN
+                self._trial_started = now
+                return True
+            if self.state == self.HALF_OPEN and now - self._trial_started >= self.reset_timeout:
+                # The trial never reported back; let another one through
+                self._trial_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class GuardResilience:
+    """
+    Deadline, hedging and circuit breaking for guard calls.
+
+    Usage:
+        resilience = GuardResilience(timeout=30.0)
+        try:
+            response = resilience.call(guard, messages)
+        except GuardUnavailable as e:
+            fall_back(e.reason)
+    """
+
+    def __init__(self, timeout: float = 30.0, hedge: bool = True, hedge_min_samples: int = 20,
+                 latency_window: int = 200, breaker: Optional[CircuitBreaker] = None,
+                 max_workers: int = 8):
+        """
+        Args:
+            timeout: Seconds before a guard call is abandoned
+            hedge: Send a second request once the first exceeds the p95 latency
+            hedge_min_samples: Successful calls observed before hedging starts
+            latency_window: Recent successful latencies kept for the p95
+            breaker: CircuitBreaker (None = default thresholds)
+            max_workers: Threads running synchronous guard calls
+        """
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        # Abandoned calls keep their thread until the model answers; the
+        # breaker stops new calls long before the pool is exhausted
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="guard-call")
+        self.stats = StatCounters(['calls', 'hedges', 'hedge_wins', 'timeouts', 'errors', 'rejected'])
+
+    # === LATENCY TRACKING ===
+
+    def p95(self) -> Optional[float]:
+        """95th percentile of recent successful call latencies (None if no samples)."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[int(0.95 * (len(samples) - 1))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a hedged request is sent, or None for no hedge."""
+        if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+            return None
+        delay = self.p95()
+        return delay if delay < self.timeout else None
+
+    # === OUTCOMES ===
+
+    def _admit(self):
+        if not self.breaker.allow():
+            self.stats.increment('rejected')
+            raise GuardUnavailable("circuit breaker open")
+        self.stats.increment('calls')
+
+    def _succeeded(self, latency: float, hedged_win: bool):
+        with self._lock:
+            self._latencies.append(latency)
+        if hedged_win:
+            self.stats.increment('hedge_wins')
+        self.breaker.record_success()
+
+    def _failed(self, error: Optional[BaseException]) -> GuardUnavailable:
+        if error is None:
+            self.stats.increment('timeouts')
+            reason = f"guard timed out after {self.timeout:.1f}s"
+        else:
+            self.stats.increment('errors')
+            reason = f"guard error: {type(error).__name__}: {error}"
+        self.breaker.record_failure()
+        return GuardUnavailable(reason)
+
+    # === CALLS ===
+
+    def call(self, guard, messages) -> Any:
+        """
+        guard.invoke(messages) with deadline, hedging and circuit breaking.
+
+        Raises:
+            GuardUnavailable: No response within the deadline, every request
+                              failed, or the circuit is open
+        """
+        self._admit()
+        try:
+            return self._call(guard, messages)
+        except GuardUnavailable:
+            raise
+        except Exception as e:
+            # e.g. the executor refused the request: still an outcome
+            raise self._failed(e) from e
+        except BaseException as e:
+            # Interrupted: report it so a half-open breaker is not left waiting
+            self._failed(e)
+            raise
+
+    def _call(self, guard, messages) -> Any:
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        hedge_delay = self.hedge_delay()
+        hedge_at = None if hedge_delay is None else start + hedge_delay
+
+        primary = self._executor.submit(guard.invoke, messages)
+        pending = {primary}
+        error = None
+        while pending:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            wake = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                self._succeeded(time.perf_counter() - start, future is not primary)
+                return response
+            if hedge_at is not None and pending and time.perf_counter() >= hedge_at:
+                # Slower than p95: race a second request against the first
+                hedge_at = None
+                self.stats.increment('hedges')
+                pending.add(self._executor.submit(guard.invoke, messages))
+
+        raise self._failed(None if pending or error is None else error)
+
+    async def acall(self, guard, messages) -> Any:
+        """Async call(): awaits guard.ainvoke and cancels abandoned requests."""
+        self._admit()
+        try:
+            return await self._acall(guard, messages)
+        except GuardUnavailable:
+            raise
+        except Exception as e:
+            raise self._failed(e) from e
+        except BaseException as e:
+            # Cancelled: report it so a half-open breaker is not left waiting
+            self._failed(e)
+            raise
+
+    async def _acall(self, guard, messages) -> Any:
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        hedge_delay = self.hedge_delay()
+        hedge_at = None if hedge_delay is None else start + hedge_delay
+
+        primary = asyncio.ensure_future(guard.ainvoke(messages))
+        pending = {primary}
+        error = None
+        try:
+            while pending:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                wake = deadline if hedge_at is None else min(deadline, hedge_at)
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, wake - now),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    self._succeeded(time.perf_counter() - start, task is not primary)
+                    return response
+                if hedge_at is not None and pending and time.perf_counter() >= hedge_at:
+                    hedge_at = None
+                    self.stats.increment('hedges')
+                    pending.add(asyncio.ensure_future(guard.ainvoke(messages)))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise self._failed(None if pending or error is None else error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Call/hedge/timeout/error counters, breaker state and latency p95."""
+        stats = self.stats.snapshot()
+        stats['breaker_state'] = self.breaker.state
+        stats['p95_latency'] = self.p95()
+        return stats
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 from langchain_ollama import ChatOllama
@@ -6,11 +7,163 @@ from langchain_core.messages import HumanMessage
 # Import our new security modules
 from .isolation import ContextualIsolator
 from .detectors import InjectionDetector
+from .cache import VerdictCache
+from .metrics import LatencyHistograms, StatCounters, prometheus_text
+from .resilience import GuardResilience, GuardUnavailable
+
+class ValidationContext:
+    """
+    Per-query state shared by every tool call the query produces.
+    
+    Layers 0 and 0.5 only look at the user's intent, so they run once when
+    the context is built (IntentSieve.prepare) instead of once per tool call
+    in every step of the agent loop.
+    """
+    
+    def __init__(self, original_intent, cleaned_intent, isolation_metadata, threats, injection_risk):
+        self.original_intent = original_intent
+        self.cleaned_intent = cleaned_intent
+        self.isolation_metadata = isolation_metadata
+        self.threats = threats
+        self.injection_risk = injection_risk
+        
+        # Lower-cased intent reused by the per-call checks
+        self.intent_lower = cleaned_intent.lower()
+
+
+class CascadePolicy:
+    """
+    Decides when Layer 2 (the guard model) may be skipped.
+    
+    The guard is the most expensive step of validation. A call skips it
+    only when all of the following hold:
+    - the action is declared read-only;
+    - its arguments are consistent with the intent;
+    - isolation cleaned nothing from the intent;
+    - and EITHER the heuristic injection risk is below risk_floor,
+    - OR the guard's recent latency exceeds latency_budget and the risk is
+      below budget_risk_ceiling.
+    
+    Destructive actions always reach the guard. No tool is read-only by
+    default, so the cascade only runs once the caller opts in.
+    
+    Usage:
+        sieve = IntentSieve(cascade=CascadePolicy(read_only_tools=('read_local_file',),
+                                                  risk_floor=0.15, latency_budget=2.0))
+        sieve.get_stats()['guard_skip_rate']
+    """
+    
+    def __init__(self, read_only_tools=(), risk_floor=0.15,
+                 latency_budget=None, budget_risk_ceiling=0.4, latency_smoothing=0.2):
+        """
+        Args:
+            read_only_tools: Tool names that cannot modify anything (() = never skip)
+            risk_floor: Heuristic risk below which read-only calls skip the guard
+            latency_budget: Seconds of guard latency tolerated for read-only calls
+                            (None = no budget)
+            budget_risk_ceiling: Risk below which an over-budget guard is skipped
+            latency_smoothing: Weight of the newest sample in the latency average
+        """
+        self.read_only_tools = frozenset(read_only_tools)
+        self.risk_floor = risk_floor
+        self.latency_budget = latency_budget
+        self.budget_risk_ceiling = budget_risk_ceiling
+        self.latency_smoothing = latency_smoothing
+        
+        # Exponential moving average of guard call latency (seconds)
+        self.guard_latency = None
+    
+    def record_guard_latency(self, seconds):
+        """Fold one observed guard call latency into the moving average."""
+        if self.guard_latency is None:
+            self.guard_latency = seconds
+        else:
+            self.guard_latency += self.latency_smoothing * (seconds - self.guard_latency)
+    
+    def skip_reason(self, context):
+        """
+        Return why a read-only call with consistent arguments may skip the
+        guard under this query's context, or None if the guard must run.
+        """
+        if context.isolation_metadata.get('threats_detected'):
+            return None
+        
+        risk = context.injection_risk
+        if risk < self.risk_floor:
+            return f"heuristic risk {risk:.2f} below floor {self.risk_floor:.2f}"
+        
+        if (self.latency_budget is not None and self.guard_latency is not None
+                and self.guard_latency > self.latency_budget and risk < self.budget_risk_ceiling):
+            return f"guard latency {self.guard_latency:.2f}s over {self.latency_budget:.2f}s budget"
+        
+        return None
+
 
 class IntentSieve:
-    def __init__(self):
-        # Neural reasoning for high-risk validation
-        self.guard = ChatOllama(model="llama-guard3:8b", temperature=0)
+    # Injection risk above which a request is blocked outright
+    INJECTION_BLOCK_THRESHOLD = 0.7
+    
+    # Guard model; also versions the verdict cache
+    GUARD_MODEL = "llama-guard3:8b"
+    
+    # Without a guard verdict, reads below this heuristic risk are still allowed
+    DEGRADED_ALLOW_RISK = 0.4
+    
+    # Timing spans recorded per validation ('total' covers the whole call)
+    LATENCY_SPANS = ('isolation', 'detection', 'symbolic', 'guard', 'routing', 'total')
+    
+    def __init__(self, verdict_cache_path=None, verdict_cache_size=1024, verdict_cache_ttl=86400.0,
+                 cascade=None, guard=None, resilience=None, guard_model=None):
+        """
+        Args:
+            verdict_cache_path: SQLite file that persists guard verdicts
+                                (None = in-memory verdict cache only)
+            verdict_cache_size: Verdicts kept in memory
+            verdict_cache_ttl: Seconds a cached verdict stays valid (None = forever)
+            cascade: CascadePolicy deciding when the guard may be skipped
+                     (None = no read-only tools, so the guard is never skipped)
+            guard: Guard chat model, or a GuardDispatcher shared between sieves
+                   so concurrent sessions are batched (None = GUARD_MODEL via Ollama)
+            resilience: GuardResilience with the guard call deadline, hedging and
+                        circuit breaker (None = defaults)
+            guard_model: Model name that versions cached verdicts (None = the
+                         guard's ``model`` attribute; required to persist
+                         verdicts of a guard without one)
+        """
+        self.resilience = resilience if resilience is not None else GuardResilience()
+        
+        # Neural reasoning for high-risk validation. The HTTP timeout also
+        # frees the worker thread of a call the resilience layer abandoned.
+        if guard is None:
+            guard = ChatOllama(
+                model=self.GUARD_MODEL,
+                temperature=0,
+                client_kwargs={'timeout': self.resilience.timeout}
+            )
+        self.guard = guard
+        
+        # Verdicts are keyed on the model that gave them, so a persisted
+        # cache never serves one guard's verdicts to another
+        if guard_model is None:
+            guard_model = getattr(guard, 'model', None)
+        if not guard_model:
+            if verdict_cache_path is not None:
+                raise ValueError("guard_model is required to persist verdicts of a guard without a 'model' attribute")
+            guard_model = f"{type(guard).__module__}.{type(guard).__qualname__}"
+        
+        # Deterministic guard (temperature 0): reuse verdicts for identical requests
+        self.verdict_cache = VerdictCache(
+            guard_model,
+            path=verdict_cache_path,
+            max_size=verdict_cache_size,
+            ttl=verdict_cache_ttl
+        )
+        self.cascade = cascade if cascade is not None else CascadePolicy()
+        self.stats = StatCounters([
+            'contexts_prepared', 'validations', 'guard_calls', 'guard_cache_hits', 'guard_skipped',
+            'degraded_decisions', 'decisions_allow', 'decisions_block', 'decisions_review'
+        ])
+        self.latency = LatencyHistograms(self.LATENCY_SPANS)
         
         # NEW: Add contextual isolation and detection layers
         self.isolator = ContextualIsolator(max_length=10000)
@@ -26,8 +179,14 @@ class IntentSieve:
         
         We allow agent-generated metadata (like 'reason' fields) and focus on
         validating that file paths or critical arguments match the intent.
+        
+        original_intent may be a ValidationContext, whose intent is already
+        lower-cased once per query.
         """
-        intent_lower = original_intent.lower()
+        if isinstance(original_intent, ValidationContext):
+            intent_lower = original_intent.intent_lower
+        else:
+            intent_lower = original_intent.lower()
         
         # For destructive actions, check critical arguments only
         # Skip metadata like 'reason' which the agent adds
@@ -52,72 +211,330 @@ class IntentSieve:
         
         return False
 
-    def validate(self, original_intent, tool_call):
+    def prepare(self, original_intent):
         """
-        Enhanced validation with multi-layer security.
+        Run the intent-only layers (0 and 0.5) once for a user query.
         
-        Returns a tuple: (STATUS, REASON)
-        STATUS can be: "ALLOW", "BLOCK", "REVIEW"
+        Returns a ValidationContext to pass to validate()/avalidate() for
+        every tool call the query produces.
         """
-        start_time = time.time()
-        action = tool_call['name']
-        args = tool_call['args']
+        self.stats.increment('contexts_prepared')
         
-        print(f"\n[SIEVE] Analyzing action: {action}...")
-
         # --- LAYER 0: CONTEXTUAL ISOLATION (NEW!) ---
         # Sanitize the user intent to remove hidden attacks
+        span_start = time.perf_counter()
         cleaned_intent, isolation_metadata = self.isolator.sanitize(original_intent)
+        self.latency.observe('isolation', time.perf_counter() - span_start)
         
         # If sanitization detected threats, log them
-        if isolation_metadata['threats_detected']:
+        if isolation_metadata.get('threats_detected'):
             logging.warning(f"[ISOLATION] Threats cleaned: {isolation_metadata['threats_detected']}")
         
         # --- LAYER 0.5: INJECTION DETECTION (NEW!) ---
-        # Analyze the cleaned intent for injection patterns
-        threats, injection_risk = self.detector.analyze(cleaned_intent)
-        
-        # If high injection risk detected, BLOCK immediately
-        if injection_risk > 0.7:
-            threat_details = ', '.join([t.threat_type for t in threats])
-            return "BLOCK", f"High injection risk detected ({injection_risk:.2f}): {threat_details}"
+        # Analyze the cleaned intent for injection patterns, in one pass.
+        # The early-exit pass only bounds the risk from below once the block
+        # decision is settled; the cascade and the degraded fallback compare
+        # the risk of read-only calls with lower thresholds, so they need the
+        # exact score. Otherwise cheapest layers run first and analysis stops
+        # once the block decision is settled.
+        span_start = time.perf_counter()
+        if self.cascade.read_only_tools:
+            threats, injection_risk = self.detector.analyze(cleaned_intent)
+        else:
+            threats, injection_risk, _ = self.detector.analyze_with_threshold(
+                cleaned_intent, self.INJECTION_BLOCK_THRESHOLD
+            )
+        self.latency.observe('detection', time.perf_counter() - span_start)
         
         # If medium injection risk, flag for additional scrutiny
-        if injection_risk > 0.4:
+        if self.INJECTION_BLOCK_THRESHOLD >= injection_risk > 0.4:
             logging.warning(f"[DETECTOR] Medium injection risk: {injection_risk:.2f}")
         
+        return ValidationContext(original_intent, cleaned_intent, isolation_metadata, threats, injection_risk)
+
+    def validate(self, original_intent, tool_call):
+        """
+        Enhanced validation with multi-layer security.
+        
+        original_intent is the user query, or the ValidationContext that
+        prepare() built for it (preferred when validating several calls).
+        
+        Returns a tuple: (STATUS, REASON)
+        STATUS can be: "ALLOW", "BLOCK", "REVIEW"
+        """
+        start = time.perf_counter()
+        return self._finish(tool_call, start, self._decide(original_intent, tool_call))
+
+    async def avalidate(self, original_intent, tool_call):
+        """
+        Async validate(): same layers and (STATUS, REASON) result, but the
+        guard model is awaited through the async chat interface.
+        """
+        start = time.perf_counter()
+        return self._finish(tool_call, start, await self._adecide(original_intent, tool_call))
+
+    def _decide(self, original_intent, tool_call):
+        verdict, check = self._screen(original_intent, tool_call)
+        if verdict is not None:
+            return verdict
+        
+        # --- LAYER 2: NEURAL (Security Check) ---
+        guard_verdict = self._cached_verdict(check)
+        if guard_verdict is None:
+            guard_start = time.perf_counter()
+            try:
+                response = self.resilience.call(self.guard, check['messages'])
+            except GuardUnavailable as e:
+                return self._degraded(check, e.reason)
+            finally:
+                self.latency.observe('guard', time.perf_counter() - guard_start)
+            self.cascade.record_guard_latency(time.perf_counter() - guard_start)
+            guard_verdict = self._store_verdict(check, response.content)
+        
+        # --- LAYER 3: RISK ASSESSMENT (Routing) ---
+        span_start = time.perf_counter()
+        verdict = self._route(check, guard_verdict)
+        self.latency.observe('routing', time.perf_counter() - span_start)
+        return verdict
+
+    async def _adecide(self, original_intent, tool_call):
+        verdict, check = self._screen(original_intent, tool_call)
+        if verdict is not None:
+            return verdict
+        
+        # --- LAYER 2: NEURAL (Security Check) ---
+        guard_verdict = await self._acached_verdict(check)
+        if guard_verdict is None:
+            guard_start = time.perf_counter()
+            try:
+                response = await self.resilience.acall(self.guard, check['messages'])
+            except GuardUnavailable as e:
+                return self._degraded(check, e.reason)
+            finally:
+                self.latency.observe('guard', time.perf_counter() - guard_start)
+            self.cascade.record_guard_latency(time.perf_counter() - guard_start)
+            guard_verdict = await self._astore_verdict(check, response.content)
+        
+        # --- LAYER 3: RISK ASSESSMENT (Routing) ---
+        span_start = time.perf_counter()
+        verdict = self._route(check, guard_verdict)
+        self.latency.observe('routing', time.perf_counter() - span_start)
+        return verdict
+
+    def _finish(self, tool_call, start, verdict):
+        """Record the outcome and total latency of one validation."""
+        status, reason = verdict
+        latency = time.perf_counter() - start
+        self.latency.observe('total', latency)
+        self.stats.increment(f'decisions_{status.lower()}')
+        if status == "BLOCK":
+            logging.warning(f"BLOCKED: {tool_call['name']} - {reason} (Time: {latency:.2f}s)")
+        return verdict
+
+    async def avalidate_all(self, original_intent, tool_calls):
+        """
+        Validate every tool call of an agent step concurrently.
+        
+        Returns a list of (STATUS, REASON) tuples in tool_calls order.
+        """
+        if not isinstance(original_intent, ValidationContext):
+            original_intent = self.prepare(original_intent)
+        return list(await asyncio.gather(
+            *(self.avalidate(original_intent, tool_call) for tool_call in tool_calls)
+        ))
+
+    def _screen(self, original_intent, tool_call):
+        """
+        Run the layers before the guard model (0.5 verdict and 1).
+        
+        Returns (verdict, check): verdict is a final (STATUS, REASON) when a
+        heuristic layer decides, else None and check carries what the guard
+        call and the routing step need.
+        """
+        start_time = time.time()
+        action = tool_call['name']
+        args = tool_call['args']
+        self.stats.increment('validations')
+        
+        print(f"\n[SIEVE] Analyzing action: {action}...")
+
+        # --- LAYERS 0 & 0.5: run once per query in prepare() ---
+        context = original_intent
+        if not isinstance(context, ValidationContext):
+            context = self.prepare(original_intent)
+        
+        # If high injection risk detected, BLOCK immediately
+        injection_risk = context.injection_risk
+        if injection_risk > self.INJECTION_BLOCK_THRESHOLD:
+            threat_details = ', '.join([t.threat_type for t in context.threats])
+            return ("BLOCK", f"High injection risk detected ({injection_risk:.2f}): {threat_details}"), None
+        
         # Use cleaned intent for remaining validation
-        original_intent = cleaned_intent
+        original_intent = context.cleaned_intent
 
         # --- LAYER 1: SYMBOLIC (Hallucination/Drift Check) ---
+        span_start = time.perf_counter()
+        verdict, is_destructive = self._symbolic_check(context, action, args, start_time)
+        self.latency.observe('symbolic', time.perf_counter() - span_start)
+        if verdict is not None:
+            return verdict, None
+
+        # Layer 2 prompt: check for Prompt Injection or Jailbreaks
+        check_msg = f"User Intent: {original_intent}\nProposed Action: {action}({args})"
+        check = {
+            'context': context,
+            'intent': original_intent,
+            'action': action,
+            'args': args,
+            'is_destructive': is_destructive,
+            'messages': [HumanMessage(content=check_msg)],
+            'start_time': start_time,
+        }
+        return None, check
+
+    def _symbolic_check(self, context, action, args, start_time):
+        """
+        Layer 1 drift check, then the cascade's guard-skip decision.
+        
+        Returns (verdict, is_destructive); verdict is None when the call
+        must go on to the guard.
+        """
         # We ensure the model isn't inventing actions the user didn't ask for.
         is_destructive = any(word in action.lower() for word in ["delete", "remove", "clear"])
         
         if is_destructive:
-            intent_authorized = any(word in original_intent.lower() for word in ["delete", "remove", "clean"])
-            args_authorized = self._is_argument_consistent(original_intent, args)
+            intent_authorized = any(word in context.intent_lower for word in ["delete", "remove", "clean"])
+            args_authorized = self._is_argument_consistent(context, args)
 
             if not (intent_authorized and args_authorized):
-                return "BLOCK", f"Semantic Drift! Action '{action}' not explicitly requested."
+                return ("BLOCK", f"Semantic Drift! Action '{action}' not explicitly requested."), is_destructive
 
-        # --- LAYER 2: NEURAL (Security Check) ---
-        # Check for Prompt Injection or Jailbreaks
-        check_msg = f"User Intent: {original_intent}\nProposed Action: {action}({args})"
-        response = self.guard.invoke([HumanMessage(content=check_msg)])
+        # --- CASCADE: skip Layer 2 for provably low-risk reads ---
+        if action in self.cascade.read_only_tools and self._is_argument_consistent(context, args):
+            skip_reason = self.cascade.skip_reason(context)
+            if skip_reason:
+                self.stats.increment('guard_skipped')
+                latency = time.time() - start_time
+                logging.info(f"AUTHORIZED: {action} (guard skipped: {skip_reason}) (Time: {latency:.2f}s)")
+                return ("ALLOW", f"Low risk read-only action (guard skipped: {skip_reason})."), is_destructive
         
-        if "unsafe" in response.content.lower():
+        return None, is_destructive
+
+    def _cached_verdict(self, check):
+        """Return the cached guard verdict for this request, or None."""
+        guard_verdict = self.verdict_cache.get(check['intent'], check['action'], check['args'])
+        if guard_verdict is not None:
+            self.stats.increment('guard_cache_hits')
+        return guard_verdict
+
+    def _store_verdict(self, check, guard_verdict):
+        """Count a guard call and cache its verdict."""
+        self.stats.increment('guard_calls')
+        self.verdict_cache.put(check['intent'], check['action'], check['args'], guard_verdict)
+        return guard_verdict
+
+    async def _acached_verdict(self, check):
+        """_cached_verdict() without blocking the event loop on SQLite."""
+        guard_verdict = await self.verdict_cache.aget(check['intent'], check['action'], check['args'])
+        if guard_verdict is not None:
+            self.stats.increment('guard_cache_hits')
+        return guard_verdict
+
+    async def _astore_verdict(self, check, guard_verdict):
+        """_store_verdict() without blocking the event loop on SQLite."""
+        self.stats.increment('guard_calls')
+        await self.verdict_cache.aput(check['intent'], check['action'], check['args'], guard_verdict)
+        return guard_verdict
+
+    def _degraded(self, check, reason):
+        """
+        Decide from the heuristic layers alone when the guard gave no verdict.
+        
+        Destructive actions go to human review, low-risk reads are allowed,
+        anything else is reviewed. The reason always says the decision was
+        degraded and why.
+        """
+        span_start = time.perf_counter()
+        self.stats.increment('degraded_decisions')
+        action = check['action']
+        context = check['context']
+        
+        if check['is_destructive']:
+            status, policy = "REVIEW", "destructive action sent to human review"
+        elif (action in self.cascade.read_only_tools
+                and context.injection_risk < self.DEGRADED_ALLOW_RISK
+                and not context.isolation_metadata.get('threats_detected')):
+            status, policy = "ALLOW", f"read-only action allowed on heuristic risk {context.injection_risk:.2f}"
+        else:
+            status, policy = "REVIEW", "action sent to human review"
+        
+        logging.warning(f"[GUARD] Degraded decision for {action}: {status} ({reason})")
+        self.latency.observe('routing', time.perf_counter() - span_start)
+        return status, f"Guard unavailable ({reason}); {policy}."
+
+    def _route(self, check, guard_verdict):
+        """Apply the guard verdict text, then route by risk (Layer 3)."""
+        action = check['action']
+        
+        if "unsafe" in guard_verdict.lower():
             return "BLOCK", "Llama Guard flagged as unsafe (Potential Injection)."
 
         # --- LAYER 3: RISK ASSESSMENT (Routing) ---
         # If we pass Layer 1 & 2, the action is 'valid', but might still be risky.
         # We route destructive actions to Human-in-the-Loop.
         
-        if is_destructive:
-            latency = time.time() - start_time
+        if check['is_destructive']:
+            latency = time.time() - check['start_time']
             logging.warning(f"REVIEW REQUIRED: {action} (Time: {latency:.2f}s)")
             return "REVIEW", "Destructive action detected."
 
         # If it's not destructive and passed safety checks, it's low risk.
-        latency = time.time() - start_time
+        latency = time.time() - check['start_time']
         logging.info(f"AUTHORIZED: {action} (Time: {latency:.2f}s)")
-        return "ALLOW", "Low risk action."
\ No newline at end of file
+        return "ALLOW", "Low risk action."
+
+    def get_stats(self):
+        """Validation counters, cascade skip/invoke rates and verdict cache statistics."""
+        stats = self.stats.snapshot()
+        
+        # Rates over calls that reached the Layer 2 decision
+        guard_decisions = stats['guard_skipped'] + stats['guard_cache_hits'] + stats['guard_calls']
+        for key, count in (('guard_skip_rate', stats['guard_skipped']),
+                           ('guard_invoke_rate', stats['guard_calls'])):
+            stats[key] = round(count / guard_decisions, 4) if guard_decisions else 0.0
+        stats['guard_latency'] = self.cascade.guard_latency
+        stats['guard_resilience'] = self.resilience.get_stats()
+        stats['verdict_cache'] = self.verdict_cache.get_stats()
+        return stats
+
+    def get_metrics(self):
+        """
+        Counters and per-layer latency histograms.
+        
+        Returns a dict with 'counters' (validation counters plus the guard
+        resilience counters as resilience_*) and 'latency': per span in
+        LATENCY_SPANS, 'count', 'sum' (seconds), cumulative 'buckets' and
+        bucket-bound estimates 'p50'/'p95'/'p99'.
+        """
+        counters = self.stats.snapshot()
+        for key, value in self.resilience.stats.snapshot().items():
+            counters[f'resilience_{key}'] = value
+        
+        latency = self.latency.histograms()
+        for span, histogram in latency.items():
+            for label, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+                histogram[label] = self.latency.quantile(span, q, histogram)
+        
+        return {'counters': counters, 'latency': latency}
+
+    def export_prometheus(self, prefix="intense_sieve"):
+        """get_metrics() in Prometheus text exposition format."""
+        metrics = self.get_metrics()
+        return prometheus_text(
+            prefix,
+            counters=metrics['counters'],
+            histograms=metrics['latency'],
+            histogram_name='validate_latency_seconds',
+            label='layer',
+            help_text='Time spent in each IntentSieve.validate layer.'
+        )
@@ -4,9 +4,12 @@ from typing import Optional
 
 # Import our security modules
 from .isolation import ContextualIsolator
+from .detectors import InjectionDetector
+from .markup import scan_html
 
-# Create a global isolator instance
+# Create global isolator and detector instances
 _isolator = ContextualIsolator()
+_detector = InjectionDetector()
 
 @tool
 def fetch_web_page(url: str):
@@ -26,14 +29,25 @@ def fetch_web_page(url: str):
     else:
         untrusted_content = f"This is a helpful article about AI safety on {url}."
     
-    # SECURITY: Sanitize external content before returning to agent
-    cleaned_content, metadata = _isolator.sanitize(untrusted_content)
+    # SECURITY: Extract and sanitize external content before returning it.
+    # Only the visible text reaches the agent, in the faithful view (hidden
+    # chars stripped, numbers and code intact); hidden elements, comments,
+    # attributes and scripts are sanitized and analyzed but never shown.
+    agent_content, threats, risk, metadata = scan_html(untrusted_content, _isolator, _detector)
     
     # Log if threats were detected
-    if metadata['threats_detected']:
-        print(f"[SECURITY] Web content sanitized: {metadata['threats_detected']}")
+    cleaned = {
+        channel: channel_metadata['threats_detected']
+        for channel, channel_metadata in metadata.items()
+        if isinstance(channel_metadata, dict) and channel_metadata.get('threats_detected')
+    }
+    if cleaned:
+        print(f"[SECURITY] Web content sanitized: {cleaned}")
+    if risk > 0.4:
+        print(f"[SECURITY] Injection risk {risk:.2f} in web content: "
+              f"{sorted({threat.threat_type.value for threat in threats})}")
     
-    return cleaned_content
+    return agent_content
 
 @tool
 def delete_system_files(reason: str):